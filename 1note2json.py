@@ -30,6 +30,12 @@ def main():
 	parser.add_argument("--output-directory", '-R', dest='output_dir', metavar='<json-directory>',
 						help="Directory name for writing revision JSON files")
 	parser.add_argument("--log", '-L', metavar='<log file>', help="Log file")
+	parser.add_argument("--mmap", '-m', action="store_true",
+						help="Map the source file to memory, instead of reading it whole")
+	parser.add_argument("--prefetch", '-P', action="store_true",
+						help="Ask the OS to read ahead the file structures in offset order, before parsing")
+	parser.add_argument("--lazy", '-z', action="store_true",
+						help="Decode objects on first access, instead of all objects when the file is opened")
 	parser.add_argument("--all-revisions", '-A', action="store_true",
 						help="Include all revisions in the output, not just the current snapshot")
 	parser.add_argument("--include-oids", '-o', action="store_true",
@@ -44,6 +50,8 @@ def main():
 						help="Generate a snapshot of a revision with this timestamp")
 	parser.add_argument("--incremental", '-i', action="store_true",
 						help="Generate revisions in incremental form")
+	parser.add_argument("--blob-store", '-B', choices=['hardlink', 'symlink', 'manifest'], default=None,
+						help="Write embedded files once to 'blobs' subdirectory of the output directory, and refer to them from revision directories by hard links, symbolic links, or 'blobs.txt' manifest")
 
 	options = parser.parse_args()
 
@@ -83,6 +91,7 @@ def main():
 		onenote.dump(log_file, options.verbose)
 		log_file.close()
 
+	onenote.close()
 	return 0
 
 if __name__ == "__main__":
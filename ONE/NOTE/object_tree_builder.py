@@ -15,13 +15,17 @@
 
 from __future__ import annotations
 import sys
+import os
+import shutil
 from typing import Iterable
 from types import SimpleNamespace
 from ..base_types import *
-from ..exception import CircularObjectReferenceException, ObjectNotFoundException
+from ..exception import CircularObjectReferenceException, ObjectNotFoundException, ArgumentException
+from ..property_id import PropertyID
 from ..STORE.revision_manifest_list import RevisionManifest
 from ..STORE.onestore import OneStoreFile
 from pathlib import Path
+from hashlib import md5
 
 def GetTopologyCreationTimeStamps(obj):
 	timestamps = []
@@ -33,17 +37,74 @@ def GetTopologyCreationTimeStamps(obj):
 	return sorted(timestamps, key=lambda t:t.TopologyCreationTimeStamp, reverse=True)
 
 class DataFileCtx:
-	def __init__(self, filename, data):
+	def __init__(self, filename, data, data_store_object=None):
 		self.data = data
+		# If the data comes from a FileDataStoreObject, it's written by streaming from the source file
+		self.data_store_object = data_store_object
 		self.filename = filename
 		self.page_persistent_guid = filename
+		# Content hashes, keyed by JCID of the referring object
+		self.content_hashes = {}
+		self.data_hash = None
+		return
+
+	def GetDataHash(self):
+		# Hash of the file data only, to name the file in the blob store
+		if self.data_hash is None:
+			self.data_hash = md5(self.data if self.data else b'', usedforsecurity=False).digest()
+		return self.data_hash
+
+	def GetContentHash(self, jcid:int):
+		# The hash is calculated once per file, and shared by all revisions referring to it
+		content_hash = self.content_hashes.get(jcid, None)
+		if content_hash is None:
+			md5hash = md5(usedforsecurity=False)
+			md5hash.update(jcid.to_bytes(4, byteorder='little', signed=False))
+			md5hash.update(self.filename.encode())
+			if self.data:
+				md5hash.update(len(self.data).to_bytes(4, byteorder='little', signed=False))
+				md5hash.update(self.data)
+			content_hash = md5hash.digest()
+			self.content_hashes[jcid] = content_hash
+		return content_hash
+
+	def WriteData(self, full_path):
+		if self.data_store_object is not None:
+			self.data_store_object.WriteFile(full_path)
+		else:
+			full_path.write_bytes(self.data)
 		return
 
 	def MakeFile(self, directory, guid):
-		full_path = Path(directory, self.filename)
-		full_path.write_bytes(self.data)
+		self.WriteData(Path(directory, self.filename))
 		return
 
+	def MakeBlob(self, blob_directory)->Path:
+		# The file is written to the blob store only once, named by the hash of its contents
+		blob_path = Path(blob_directory, self.GetDataHash().hex() + Path(self.filename).suffix)
+		if not blob_path.exists():
+			self.WriteData(blob_path)
+		return blob_path
+
+	def MakeBlobLink(self, directory, blob_directory, blob_store):
+		blob_path = self.MakeBlob(blob_directory)
+		full_path = Path(directory, self.filename)
+		if blob_store == 'manifest':
+			# The file is only listed in blobs.txt of the directory
+			return blob_path
+
+		if full_path.is_symlink() or full_path.exists():
+			full_path.unlink()
+		if blob_store == 'symlink':
+			full_path.symlink_to(os.path.relpath(blob_path, directory))
+		else:
+			try:
+				os.link(blob_path, full_path)
+			except OSError:
+				# The file system doesn't support hard links
+				shutil.copyfile(blob_path, full_path)
+		return blob_path
+
 	def IsFile(self):
 		return True
 
@@ -63,13 +124,21 @@ class RevisionBuilderCtx:
 	ROOT_ROLE_CONTENTS = RevisionManifest.ROOT_ROLE_CONTENTS
 	ROOT_ROLE_PAGE_METADATA = RevisionManifest.ROOT_ROLE_PAGE_METADATA
 	ROOT_ROLE_REVISION_METADATA = RevisionManifest.ROOT_ROLE_REVISION_METADATA
+	# These attributes are only assigned when the contents role is built
+	CONTENTS_ATTRIBUTES = frozenset(('page_hash', 'page_title', 'conflicts', 'data_objects'))
 
 	def __init__(self, property_set_factory,
 				revision:RevisionManifest, object_space_ctx:ObjectSpaceBuilderCtx):
+		self.contents_built = False
 		self.property_set_factory = property_set_factory
 		self.onestore = object_space_ctx.onestore
 		self.gosid = object_space_ctx.gosid
 		self.os_index = object_space_ctx.os_index
+		self.data_files = object_space_ctx.data_files
+		self.object_cache = object_space_ctx.object_cache
+		self.contents_by_raw_hash = object_space_ctx.contents_by_raw_hash
+		# Objects and files referred by the object being built, to validate the cached object in other revisions
+		self.dependencies = None
 		self.verbosity = object_space_ctx.verbosity
 
 		self.revision = revision
@@ -81,18 +150,25 @@ class RevisionBuilderCtx:
 
 		self.revision_roles = {}
 		self.obj_dict = {}
-		self.data_objects = {}
 		self.page_persistent_guid:GUID = None
 		self.filename = None
-		self.page_title = 'notitle'
+		self.metadata_title = 'notitle'
 		self.page_level = None
-		self.page_hash = b''
+		self.metadata_hash = b''
 		self.conflict_author = None
-		self.conflicts = {}
+		self.contents_oid = None
+		self.raw_hash = None
 
-		# Build all roles
+		# Build the metadata roles. The contents role is only built on first access,
+		# because the version timeline doesn't need contents of all historical revisions
 		for role in self.revision.GetRootObjectRoles():
 			oid = self.revision.GetRootObjectId(role)
+			if role == self.ROOT_ROLE_CONTENTS:
+				# Keep the role order
+				self.revision_roles[role] = None
+				self.contents_oid = oid
+				continue
+
 			root_obj = self.GetObjectReference(oid)
 			self.revision_roles[role] = root_obj
 
@@ -104,47 +180,114 @@ class RevisionBuilderCtx:
 				# Not part of page_hash
 			elif role == self.ROOT_ROLE_PAGE_METADATA:
 				self.page_persistent_guid = str(getattr(root_obj, 'NotebookManagementEntityGuid', ""))
-				self.page_title = getattr(root_obj, 'CachedTitleString', self.page_title)
+				self.metadata_title = getattr(root_obj, 'CachedTitleString', self.metadata_title)
 				self.page_level = getattr(root_obj, 'PageLevel', None)
-				self.page_hash += root_obj.get_hash()
+				self.metadata_hash += root_obj.get_hash()
 				self.has_conflict_pages = getattr(root_obj, 'HasConflictPages', False)
 				self.conflict_author = getattr(root_obj, 'ConflictingUserName', None)
 				if self.conflict_author:
 					# For conflict pages, an actual usable timestamp is in TopologyCreationTimeStamp
 					self.last_modified_timestamp = getattr(root_obj, 'TopologyCreationTimeStamp', self.last_modified_timestamp)
-			elif role == self.ROOT_ROLE_CONTENTS:
-				self.page_hash += root_obj.get_hash()
-				if root_obj._jcid_name == 'jcidSectionNode':
-					self.page_title = 'Section root'
-					# If this is a root page, find the most recent TopologyCreationTimeStamp
-					if self.last_modified_timestamp is None:
-						topology_creation_timestamps = GetTopologyCreationTimeStamps(root_obj)
-						if topology_creation_timestamps:
-							self.last_modified_timestamp = topology_creation_timestamps[0].TopologyCreationTimeStamp
-
-				ChildGraphSpaceElementNodes = getattr(root_obj, 'ChildGraphSpaceElementNodes', None)
-				if not ChildGraphSpaceElementNodes:
-					continue
-				# The metadata object OID is made from OSID in ChildGraphSpaceElementNodes by XOR with GUID
-				# { 0x22a8c031, 0x3600, 0x42ee, { 0xb7, 0x14, 0xd7, 0xac, 0xda, 0x24, 0x35, 0xe8 } },
-				# or {22a8c031-3600-42ee-b714-d7acda2435e8}.
-				seed_guid = ExGUID(b'\x31\xC0\xA8\x22\x00\x36\xEE\x42\xb7\x14\xD7\xAC\xDA\x24\x35\xE8', 0)
-				metadata_objects = {}
-				MetaDataObjectsAboveGraphSpace = getattr(root_obj, 'MetaDataObjectsAboveGraphSpace', ())
-				for metadata_obj in MetaDataObjectsAboveGraphSpace:
-					metadata_objects[metadata_obj._oid ^ seed_guid] = metadata_obj
-					continue
+			continue
 
-				for conflict_space in ChildGraphSpaceElementNodes:
-					self.conflicts[conflict_space] = metadata_objects.get(conflict_space, None)
-					continue
+		if self.last_modified_timestamp is None and self.contents_oid is not None:
+			# The timestamp of a section root revision is only available from its contents
+			self.BuildContents()
+		return
+
+	def __getattr__(self, name):
+		# Accessing one of the contents attributes builds the contents role
+		if name not in self.CONTENTS_ATTRIBUTES or self.contents_built:
+			raise AttributeError(name)
+		self.BuildContents()
+		return getattr(self, name)
+
+	def BuildContents(self):
+		self.data_objects = {}
+		self.conflicts = {}
+		self.page_title = self.metadata_title
+		self.page_hash = self.metadata_hash
+
+		try:
+			self.MakeContentsRole()
+		except:
+			# The revision is left not built. The contents attributes are made again on next access
+			for name in self.CONTENTS_ATTRIBUTES:
+				self.__dict__.pop(name, None)
+			for key, revision_ctx in list(self.contents_by_raw_hash.items()):
+				if revision_ctx is self:
+					del self.contents_by_raw_hash[key]
+				continue
+			# Drop the objects left incomplete
+			self.obj_dict = {oid : obj for oid, obj in self.obj_dict.items() if obj is not NotImplemented}
+			self.dependencies = None
+			raise
+
+		self.contents_built = True
+		return
+
+	def MakeContentsRole(self):
+		if self.contents_oid is None:
+			return
+
+		# If another revision has the same Merkle hash of raw contents, its built contents are reused
+		contents_key = (self.revision.GetObjectRawHash(self.contents_oid), self.property_set_factory)
+		same_contents_ctx = self.contents_by_raw_hash.get(contents_key, None)
+		if same_contents_ctx is not None:
+			root_obj = same_contents_ctx.GetRootObject()
+			self.data_objects.update(same_contents_ctx.data_objects)
+		else:
+			root_obj = self.GetObjectReference(self.contents_oid)
+			self.contents_by_raw_hash[contents_key] = self
+		self.revision_roles[self.ROOT_ROLE_CONTENTS] = root_obj
+
+		self.page_hash += root_obj.get_hash()
+		if root_obj._jcid_name == 'jcidSectionNode':
+			self.page_title = 'Section root'
+			# If this is a root page, find the most recent TopologyCreationTimeStamp
+			if self.last_modified_timestamp is None:
+				topology_creation_timestamps = GetTopologyCreationTimeStamps(root_obj)
+				if topology_creation_timestamps:
+					self.last_modified_timestamp = topology_creation_timestamps[0].TopologyCreationTimeStamp
+
+		ChildGraphSpaceElementNodes = getattr(root_obj, 'ChildGraphSpaceElementNodes', None)
+		if not ChildGraphSpaceElementNodes:
+			return
+		# The metadata object OID is made from OSID in ChildGraphSpaceElementNodes by XOR with GUID
+		# { 0x22a8c031, 0x3600, 0x42ee, { 0xb7, 0x14, 0xd7, 0xac, 0xda, 0x24, 0x35, 0xe8 } },
+		# or {22a8c031-3600-42ee-b714-d7acda2435e8}.
+		seed_guid = ExGUID(b'\x31\xC0\xA8\x22\x00\x36\xEE\x42\xb7\x14\xD7\xAC\xDA\x24\x35\xE8', 0)
+		metadata_objects = {}
+		MetaDataObjectsAboveGraphSpace = getattr(root_obj, 'MetaDataObjectsAboveGraphSpace', ())
+		for metadata_obj in MetaDataObjectsAboveGraphSpace:
+			metadata_objects[metadata_obj._oid ^ seed_guid] = metadata_obj
 			continue
 
+		for conflict_space in ChildGraphSpaceElementNodes:
+			self.conflicts[conflict_space] = metadata_objects.get(conflict_space, None)
+			continue
 		return
 
 	def GetRootObject(self, role=ROOT_ROLE_CONTENTS):
+		if role == self.ROOT_ROLE_CONTENTS and not self.contents_built:
+			self.BuildContents()
 		return self.revision_roles.get(role, None)
 
+	def GetConflictSpaces(self):
+		# Returns IDs of the conflict page object spaces. They're read from the raw contents property set,
+		# without building the contents
+		if self.contents_built:
+			return self.conflicts.keys()
+		if self.contents_oid is None:
+			return ()
+		prop_set = self.revision.GetObjectById(self.contents_oid)
+		if prop_set is None:
+			return ()
+		ChildGraphSpaceElementNodes = prop_set.GetProperty(PropertyID.ChildGraphSpaceElementNodes.value, None)
+		if ChildGraphSpaceElementNodes is None:
+			return ()
+		return ChildGraphSpaceElementNodes.value
+
 	def GetObjectReference(self, oid):
 		if oid is None:
 			return None
@@ -156,6 +299,8 @@ class RevisionBuilderCtx:
 
 		if obj is not None:
 			# Already built
+			if self.dependencies is not None:
+				self.dependencies.append((oid, obj))
 			return obj
 
 		self.obj_dict[oid] = NotImplemented
@@ -164,8 +309,41 @@ class RevisionBuilderCtx:
 		if prop_set is None:
 			raise ObjectNotFoundException("Object %s not found in revision %s" % (oid, self.rid))
 
-		obj = self.MakeObject(prop_set, oid)	# Never None
+		parent_dependencies = self.dependencies
+		self.dependencies = []
+		obj = self.GetCachedObject(prop_set, oid)
+		if obj is None:
+			self.dependencies.clear()
+			obj = self.MakeObject(prop_set, oid)	# Never None
+			self.object_cache[(id(prop_set), oid, self.property_set_factory)] = (prop_set, obj, tuple(self.dependencies))
+		self.dependencies = parent_dependencies
+
 		self.obj_dict[oid] = obj
+		if parent_dependencies is not None:
+			parent_dependencies.append((oid, obj))
+		return obj
+
+	def GetCachedObject(self, prop_set, oid):
+		# An object built from the same property set in another revision of this object space can be reused,
+		# if all objects it refers to resolve to the same objects in this revision
+		cache_entry = self.object_cache.get((id(prop_set), oid, self.property_set_factory), None)
+		if cache_entry is None:
+			return None
+
+		cached_prop_set, obj, dependencies = cache_entry
+		if cached_prop_set is not prop_set:
+			return None
+
+		for dependency in dependencies:
+			if type(dependency) is DataFileCtx:
+				# The object refers to an embedded file
+				self.data_objects[dependency.filename] = dependency
+			elif self.GetObjectReference(dependency[0]) is not dependency[1]:
+				return None
+			continue
+		# Pruned properties of the reused object are built with the revision which used it last.
+		# They don't refer to other objects, see NEVER_PRUNED_PROPERTY_TYPES
+		obj._revision_ctx = self
 		return obj
 
 	def MakeObject(self, prop_set, oid=None):
@@ -177,18 +355,28 @@ class RevisionBuilderCtx:
 		filename = str(guid) + extension
 		obj = self.data_objects.get(filename, None)
 		if obj is None:
-			obj = DataFileCtx(filename, self.onestore.GetDataStoreObjectData(guid))
-			obj.os_index = self.os_index
+			# The file context is shared by all revisions and object spaces
+			obj = self.data_files.get(filename, None)
+			if obj is None:
+				data_store_object = self.onestore.GetDataStoreObject(guid)
+				obj = DataFileCtx(filename, data_store_object.GetData(), data_store_object)
+				self.data_files[filename] = obj
 			self.data_objects[filename] = obj
+		if self.dependencies is not None:
+			self.dependencies.append(obj)
 		return obj
 
 	def ReadOnefile(self, onefilename, extension):
 		filename = onefilename + extension
 		obj = self.data_objects.get(filename, None)
 		if obj is None:
-			obj = DataFileCtx(filename, self.onestore.ReadOnefile(onefilename))
-			obj.os_index = self.os_index
+			obj = self.data_files.get(filename, None)
+			if obj is None:
+				obj = DataFileCtx(filename, self.onestore.ReadOnefile(onefilename))
+				self.data_files[filename] = obj
 			self.data_objects[filename] = obj
+		if self.dependencies is not None:
+			self.dependencies.append(obj)
 		return obj
 
 	def IsFile(self):
@@ -206,6 +394,16 @@ class RevisionBuilderCtx:
 	def GetHash(self):
 		return self.page_hash
 
+	def GetRawHash(self):
+		# Hash of the page metadata and raw Merkle hash of the contents.
+		# Unlike GetHash(), it doesn't need the contents built
+		if self.raw_hash is None:
+			raw_hash = self.metadata_hash
+			if self.contents_oid is not None:
+				raw_hash += self.revision.GetObjectRawHash(self.contents_oid)
+			self.raw_hash = raw_hash
+		return self.raw_hash
+
 	def dump(self, fd, verbose=None):
 		if self.conflict_author:
 			print("%s (%d): GUID=%s, Level=%s, Author=%s, ConflictAuthor=%s, title=%s" % (
@@ -245,9 +443,17 @@ class ObjectSpaceBuilderCtx:
 	for a single object space.
 	'''
 
-	def __init__(self, onestore:OneStoreFile, property_set_factory, object_space, index:int, options):
+	def __init__(self, onestore:OneStoreFile, property_set_factory, object_space, index:int, options,
+				data_files:dict=None):
 		self.options = options
 		self.onestore = onestore
+		# DataFileCtx objects of embedded files, keyed by filename. Shared by all object spaces of the file
+		self.data_files = data_files if data_files is not None else {}
+		# Built objects, shared by all revisions of the object space.
+		# Keyed by (id(PropertySet), oid, property set factory)
+		self.object_cache = {}
+		# Revisions with built contents, keyed by (raw Merkle hash of contents, property set factory)
+		self.contents_by_raw_hash = {}
 		self.gosid = object_space.gosid
 		self.object_space = object_space
 		self.os_index = index
@@ -370,17 +576,21 @@ class ObjectTreeBuilder:
 		self.object_spaces:dict[ExGUID, ObjectSpaceBuilderCtx] = {}
 		self.root_gosid = onestore.GetRootObjectSpaceId()
 		self.versions = None
+		self.version_timeline = None
 		self.version_timestamps = []
 		# The option value is in minutes
 		self.combine_revisions_time_span = getattr(options, 'combine_revisions', 0)
 		# Convert to 100 ns units of Windows FILETIME
 		self.combine_revisions_time_span *= 60 * 1000 * 10000
+		# Embedded file contexts, shared by all object spaces
+		self.data_files = {}
 
 		# Derived classes MUST do their initialization _before_ invoking super().__init__()
 		os_index = 0
 		for gosid in onestore.GetObjectSpaces():
 			object_space = onestore.GetObjectSpace(gosid)
-			self.object_spaces[gosid] = self.OBJECT_SPACE_BUILDER(onestore, property_set_factory, object_space, os_index, options)
+			self.object_spaces[gosid] = self.OBJECT_SPACE_BUILDER(onestore, property_set_factory, object_space, os_index, options,
+															data_files=self.data_files)
 			os_index += 1
 			continue
 
@@ -396,10 +606,7 @@ class ObjectTreeBuilder:
 				print(guid, page_ctx.gosid, file=fd)
 		return
 
-	def GetVersions(self):
-		if self.versions is not None:
-			return self.versions
-
+	def GetVersionTimeline(self)->list[list[RevisionBuilderCtx]]:
 		'''
 		History is generated starting backwards from the current view,
 		using the initial view from the root index. Each item in the root index has "topology created"
@@ -411,10 +618,14 @@ class ObjectTreeBuilder:
 		For example, if you move a page in the index, a new revision is created, but there's no new timestamp of the change.
 
 		We'll build the tree starting from the oldest revision, using the root revision of the index
+
+		Returns a list of page revision lists, for each timestamp where the raw page tree changes.
+		The pages are compared by their metadata and raw Merkle hashes, their contents are not built.
 		'''
+		if self.version_timeline is not None:
+			return self.version_timeline
 
-		self.versions = []
-		rev = None
+		self.version_timeline = []
 
 		timestamps = set()
 		object_space_tree = {} # Indexed by OSID
@@ -457,55 +668,93 @@ class ObjectTreeBuilder:
 				continue
 
 			revision_ctx_list.sort(key=lambda rev: rev.last_modified_timestamp)
-			Author = revision_ctx_list[-1].last_modified_by
-			version_timestamp = revision_ctx_list[-1].last_modified_timestamp
 
-			version_tree = {}
-			for revision_ctx in revision_ctx_list:
-				guid = revision_ctx.page_persistent_guid
-				if guid not in version_tree:
-					version_tree[guid] = revision_ctx
-					continue
-
-				prev_revision_ctx = version_tree[guid]
-				if prev_revision_ctx.last_modified_timestamp < revision_ctx.last_modified_timestamp:
-					version_tree[guid] = revision_ctx
-					for i in range(1,100):
-						ext_guid = "%s-%d" % (guid, i)
-						if ext_guid not in version_tree:
-							break
-						del version_tree[ext_guid]
-						continue
-				elif revision_ctx.GetHash() != prev_revision_ctx.GetHash():
-					for i in range(1,100):
-						ext_guid = "%s-%d" % (guid, i)
-						if ext_guid not in version_tree:
-							version_tree[ext_guid] = revision_ctx
-							break
-						continue
+			version_tree = self.MakeVersionTree(revision_ctx_list, RevisionBuilderCtx.GetRawHash)
+			tree_list = sorted((guid, revision_ctx.GetRawHash()) for guid, revision_ctx in version_tree.items())
 
+			# See if the previous version_tree is identical. If the raw pages are same,
+			# the built pages are same, too
+			if prev_version_tree_list == tree_list:
 				continue
 
-			# Re-sort the tree in object space order
-			sorted_version_tree = sorted(version_tree.items(), key=lambda rev: rev[1].os_index)
-			version_tree = {}
-			for guid, revision_ctx in sorted_version_tree:
+			self.version_timeline.append(revision_ctx_list)
+			prev_version_tree_list = tree_list
+			continue
+
+		return self.version_timeline
+
+	def MakeVersionTree(self, revision_ctx_list:list[RevisionBuilderCtx], get_hash, include_files:bool=False)->dict:
+		# Returns a dictionary of the page revisions and conflict pages, keyed by page GUID,
+		# optionally with the embedded files, keyed by filename.
+		# 'get_hash' is used to tell apart different pages with same GUID
+		version_tree = {}
+		for revision_ctx in revision_ctx_list:
+			guid = revision_ctx.page_persistent_guid
+			if guid not in version_tree:
 				version_tree[guid] = revision_ctx
+				continue
 
-				# Add conflict pages
-				for gosid in revision_ctx.conflicts:
-					obj_space_ctx = self.object_spaces[gosid]
-					conflict_ctx = obj_space_ctx.GetVersionByTimestamp(revision_ctx.last_modified_timestamp, upper_bound=True)
-					if conflict_ctx is not None:
-						ext_guid = "%s-conflict-%s" % (guid, conflict_ctx.page_persistent_guid)
-						version_tree[ext_guid] = conflict_ctx
+			prev_revision_ctx = version_tree[guid]
+			if prev_revision_ctx.last_modified_timestamp < revision_ctx.last_modified_timestamp:
+				version_tree[guid] = revision_ctx
+				for i in range(1,100):
+					ext_guid = "%s-%d" % (guid, i)
+					if ext_guid not in version_tree:
+						break
+					del version_tree[ext_guid]
+					continue
+			elif get_hash(revision_ctx) != get_hash(prev_revision_ctx):
+				for i in range(1,100):
+					ext_guid = "%s-%d" % (guid, i)
+					if ext_guid not in version_tree:
+						version_tree[ext_guid] = revision_ctx
+						break
 					continue
 
-				for guid, data_obj in revision_ctx.data_objects.items():
-					version_tree[guid] = data_obj
+			continue
 
+		# Re-sort the tree in object space order
+		sorted_version_tree = sorted(version_tree.items(), key=lambda rev: rev[1].os_index)
+		version_tree = {}
+		for guid, revision_ctx in sorted_version_tree:
+			version_tree[guid] = revision_ctx
+
+			# Add conflict pages
+			for gosid in revision_ctx.GetConflictSpaces():
+				obj_space_ctx = self.object_spaces[gosid]
+				conflict_ctx = obj_space_ctx.GetVersionByTimestamp(revision_ctx.last_modified_timestamp, upper_bound=True)
+				if conflict_ctx is not None:
+					ext_guid = "%s-conflict-%s" % (guid, conflict_ctx.page_persistent_guid)
+					version_tree[ext_guid] = conflict_ctx
 				continue
 
+			if not include_files:
+				continue
+
+			for guid, data_obj in revision_ctx.data_objects.items():
+				version_tree[guid] = data_obj
+
+			continue
+
+		return version_tree
+
+	def GetVersions(self):
+		if self.versions is not None:
+			return self.versions
+
+		self.versions = []
+		rev = None
+
+		# The versions are made from the points of the timeline where the raw pages change.
+		# The built pages are compared, to drop the versions without changes
+		# visible at the requested verbosity level
+		prev_version_tree_list = []
+		for revision_ctx_list in self.GetVersionTimeline():
+			Author = revision_ctx_list[-1].last_modified_by
+			version_timestamp = revision_ctx_list[-1].last_modified_timestamp
+
+			version_tree = self.MakeVersionTree(revision_ctx_list, RevisionBuilderCtx.GetHash, include_files=True)
+
 			# Sort in GUID (first item in the tuples) order
 			tree_list = sorted((guid, item_ctx.GetHash()) for guid, item_ctx in version_tree.items())
 
@@ -534,8 +783,26 @@ class ObjectTreeBuilder:
 
 		return self.versions
 
-	def _WriteVersionFiles(self, version, directory, prev_directory={}, incremental=False):
+	def GetCurrentVersion(self):
+		# Returns the current version, with the most recent revision of each page.
+		# Only the contents of these revisions are built
+		timeline = self.GetVersionTimeline()
+		if not timeline:
+			return None
+
+		revision_ctx_list = timeline[-1]
+		version_timestamp = revision_ctx_list[-1].last_modified_timestamp
+		return SimpleNamespace(
+					directory=self.MakeVersionTree(revision_ctx_list, RevisionBuilderCtx.GetRawHash, include_files=True),
+					CreatedTimeStamp=version_timestamp,
+					LastModifiedTimeStamp=version_timestamp,
+					Author=revision_ctx_list[-1].last_modified_by,
+					)
+
+	def _WriteVersionFiles(self, version, directory, prev_directory={}, incremental=False,
+						blob_directory=None, blob_store=None):
 		changed = []
+		blobs = []
 
 		for guid, item_ctx in version.directory.items():
 			prev_item = prev_directory.get(guid, None)
@@ -545,9 +812,19 @@ class ObjectTreeBuilder:
 				elif incremental:
 					continue
 
+			if blob_store is not None and item_ctx.IsFile():
+				blob_path = item_ctx.MakeBlobLink(directory, blob_directory, blob_store)
+				blobs.append((item_ctx.GetFilename(), blob_path))
+				continue
+
 			item_ctx.MakeFile(directory, guid)
 			continue
 
+		if blob_store == 'manifest' and blobs:
+			with open(Path(directory, 'blobs.txt'), 'wt') as blobs_file:
+				for filename, blob_path in blobs:
+					print("%s:%s" % (filename, Path(os.path.relpath(blob_path, directory)).as_posix()), file=blobs_file)
+
 		with open(Path(directory, 'index.txt'), 'wt') as pages_file:
 			for item_ctx in version.directory.values():
 				if item_ctx.IsFile():
@@ -565,6 +842,15 @@ class ObjectTreeBuilder:
 		else:
 			directory.mkdir(parents=True)
 
+		# Embedded files can be written once to 'blobs' directory, and linked from the version directories
+		blob_store = getattr(options, 'blob_store', None)
+		blob_directory = None
+		if blob_store is not None:
+			if blob_store not in ('hardlink', 'symlink', 'manifest'):
+				raise ArgumentException("Invalid blob store mode '%s'" % (blob_store,))
+			blob_directory = Path(directory, 'blobs')
+			blob_directory.mkdir(exist_ok=True)
+
 		if not getattr(options, 'all_revisions', False):
 			timestamp = getattr(options, 'timestamp', None)
 			if timestamp is not None:
@@ -572,8 +858,11 @@ class ObjectTreeBuilder:
 				if version is None:
 					return
 			else:
-				version = self.GetVersions()[-1]
-			return self._WriteVersionFiles(version, directory)
+				version = self.GetCurrentVersion()
+				if version is None:
+					return
+			return self._WriteVersionFiles(version, directory,
+								blob_directory=blob_directory, blob_store=blob_store)
 
 		incremental = getattr(options, 'incremental', False)
 
@@ -589,7 +878,8 @@ class ObjectTreeBuilder:
 			version_dir = Path(directory, version_str)
 			version_dir.mkdir(exist_ok=True)
 
-			changed = self._WriteVersionFiles(version, version_dir, prev_directory, incremental)
+			changed = self._WriteVersionFiles(version, version_dir, prev_directory, incremental,
+								blob_directory=blob_directory, blob_store=blob_store)
 
 			print('[version "v%d"]' % (timestamp), file=versions_file)
 			print('\tAUTHOR =', version.Author, file=versions_file)
@@ -597,7 +887,10 @@ class ObjectTreeBuilder:
 			print('\tDIRECTORY =', version_str, file=versions_file)
 
 			def sort_key(rev):
-				return (rev.os_index, rev.page_persistent_guid)
+				# Data files are shared by all object spaces, and go after the pages, by filename
+				if rev.IsFile():
+					return (1, 0, rev.filename)
+				return (0, rev.os_index, rev.page_persistent_guid)
 
 			added = sorted((version.directory[guid] for guid in set(version.directory) - set(prev_directory)),
 							key=sort_key)
@@ -35,10 +35,16 @@ class OneNote:
 		elif onefile.IsNotebookToc2():
 			return OneNotebookToc2(onefile, filename, options, log_file=log_file)
 
+	def close(self):
+		if self.onestore is not None:
+			self.onestore.close()
+		return
+
 	def __enter__(self):
 		return self
 
 	def __exit__(self, exception_type, exception_value, exception_traceback):
+		self.close()
 		return False
 
 	def GetDefaultTreeBuilder(self, options):
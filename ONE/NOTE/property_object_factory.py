@@ -50,16 +50,25 @@ class PropertyObject:
 			value = _property.value
 		self.value = value	# usable value or array of values from raw data
 
-		if str_value is None:
-			str_value = _property.str_value
-		self.str_value:str|list[str] = str_value	# value or array of values in string form
+		# If not given, str_value and display_value are taken from the source property
+		# on first access, see __getattr__
+		self._property = _property
+		if str_value is not None:
+			self.str_value:str|list[str] = str_value	# value or array of values in string form
 
-		if display_value is None:
-			display_value = _property.display_value
-		self.display_value = display_value	# Single string to display the value
+		if display_value is not None:
+			self.display_value = display_value	# Single string to display the value
 
 		return
 
+	def __getattr__(self, name):
+		# Only called when the attribute is not set yet
+		if name == 'str_value' or name == 'display_value':
+			value = getattr(self._property, name)
+			setattr(self, name, value)
+			return value
+		raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+
 	def make_object(self, property_set_obj, revision_ctx):
 		'''
 		property_set_obj is the parent property set
@@ -20,6 +20,24 @@ from ..property_id import *
 from enum import IntEnum
 from hashlib import md5
 
+# PropertyObject.make_object() can lower min_verbosity of a property down to this level, but not below.
+# A property with higher minimum verbosity than requested is not built.
+PRUNED_PROPERTY_MIN_VERBOSITY = 4
+
+# Properties of these types refer to other objects, which can resolve differently in each revision.
+# They're never pruned, to have the referred objects built with the revision, and recorded as dependencies
+# of the object in the object cache shared by the revisions. The pruned properties don't depend on the revision.
+NEVER_PRUNED_PROPERTY_TYPES = frozenset((
+	int(PropertyTypeID.ObjectID),
+	int(PropertyTypeID.ArrayOfObjectIDs),
+	int(PropertyTypeID.ArrayOfPropertyValues),
+	int(PropertyTypeID.PropertySet),
+	))
+
+# Plans to build properties of property set objects, keyed by
+# (PropertySetObject class, JCID, tuple of property IDs). See PropertySetObject.GetPropertiesPlan
+PropertiesPlanCache = {}
+
 class PropertySetObject:
 	JCID = NotImplemented
 	JCID_CLASS = PropertySetJCID
@@ -40,34 +58,59 @@ class PropertySetObject:
 			self.min_verbosity = 4
 		self._display_name = self._jcid_name
 		self._properties = {}
+		# Properties not emitted at the requested verbosity level; built on first access
+		self._pruned_properties = {}
+		self._revision_ctx = None
 		return
 
 	def __getattr__(self, name: str):
 		try:
-			return self._properties[name].get_object_value()
+			prop_obj = self._properties[name]
 		except KeyError as e:
 			raise AttributeError("'%s' object has no attribute '%s'" % (self._display_name, e.args[0]),self) from e
+		if name in self._pruned_properties:
+			prop_obj = self.BuildPrunedProperty(name)
+		return prop_obj.get_object_value()
 
-	def get(self, name:str, *default):
+	def get(self, name:str, *default, revision_ctx=None):
+		if name in self._pruned_properties:
+			return self.BuildPrunedProperty(name, revision_ctx)
 		return self._properties.get(name, *default)
 
+	def BuildPrunedProperty(self, key, revision_ctx=None):
+		# The property is built with the revision accessing it. If not given,
+		# the revision which last built or reused this object is used
+		if revision_ctx is None:
+			revision_ctx = self._revision_ctx
+		prop_obj = self._pruned_properties.pop(key)
+		prop_obj.make_object(self, revision_ctx)
+		return prop_obj
+
 	def make_object(self, revision_ctx, property_set:PropertySet):
 		# parent revision contains oid->PropertySet table
 		# object_table contains objects already built
-		properties_verbosity = self.PROPERTIES_VERBOSITY
-		properties_order = self.PROPERTIES_ORDER
+		verbosity = revision_ctx.verbosity
+		self._revision_ctx = revision_ctx
 
 		md5hash = md5(usedforsecurity=False)
 		md5hash.update(self._jcid.jcid.to_bytes(4, byteorder='little', signed=False))
 
-		for prop in sorted(property_set.Properties(), key=lambda k:properties_order.get(k.property_id, k.property_id)):
-			prop_obj = self.PROPERTY_FACTORY(prop)
-			if prop_obj is NotImplemented:
-				continue
+		for i, property_class, min_verbosity, prune_verbosity in self.GetPropertiesPlan(property_set):
+			prop_obj = property_class(property_set.MakeProperty(i))
 
-			prop_obj.min_verbosity = properties_verbosity.get(prop_obj.property_id, 5)
+			prop_obj.min_verbosity = min_verbosity
 			# make_object can override prop_obj.min_verbosity
 
+			if prune_verbosity > verbosity:
+				# This property won't be emitted at this verbosity level.
+				# Its make_object() is not called (and its child objects are not built),
+				# unless it's accessed later
+				self._properties[prop_obj.key] = prop_obj
+				self._pruned_properties[prop_obj.key] = prop_obj
+				if self.min_verbosity > prop_obj.min_verbosity:
+					self.min_verbosity = prop_obj.min_verbosity
+				continue
+
 			prop_obj.make_object(self, revision_ctx)
 
 			if self.min_verbosity > prop_obj.min_verbosity:
@@ -81,16 +124,62 @@ class PropertySetObject:
 		self.md5 = md5hash.digest()
 
 		if self.CHILD_NODES_PROPERTY_ENUM is not None:
-			ChildNodes = self.get(self.CHILD_NODES_PROPERTY_ENUM.name, None)
+			ChildNodes = self.get(self.CHILD_NODES_PROPERTY_ENUM.name, None, revision_ctx=revision_ctx)
 			if ChildNodes is not None:
 				self.min_verbosity = ChildNodes.min_verbosity
 			else:
-				self.min_verbosity = properties_verbosity[self.CHILD_NODES_PROPERTY_ENUM.value]
+				self.min_verbosity = self.PROPERTIES_VERBOSITY[self.CHILD_NODES_PROPERTY_ENUM.value]
 
 		return
 
+	def GetPropertiesPlan(self, property_set:PropertySet):
+		# Property sets of same JCID mostly have same properties. The plan to build them is only made once
+		prop_ids = tuple(property_set.PropertyIDs())
+		key = (type(self), self._jcid.jcid, prop_ids)
+		plan = PropertiesPlanCache.get(key, None)
+		if plan is None:
+			plan = self.MakePropertiesPlan(property_set, prop_ids)
+			PropertiesPlanCache[key] = plan
+		return plan
+
+	def MakePropertiesPlan(self, property_set:PropertySet, prop_ids:tuple):
+		'''
+		Returns a tuple of (index in the property set, property object class, min verbosity, prune verbosity),
+		in order of building the properties.
+		'''
+		properties_verbosity = self.PROPERTIES_VERBOSITY
+		properties_order = self.PROPERTIES_ORDER
+		always_build = self.ALWAYS_BUILD_PROPERTIES
+
+		# Same as in the property set dictionary, the last property with the same ID wins
+		indices = {}
+		for i, prop_id in enumerate(prop_ids):
+			indices[prop_id] = i
+			continue
+
+		plan = []
+		for prop_id in sorted(indices, key=lambda k:properties_order.get(k, k)):
+			i = indices[prop_id]
+			property_class = self.PROPERTY_FACTORY.get_property_class(property_set.MakeProperty(i))
+			if property_class is NotImplemented:
+				continue
+
+			min_verbosity = properties_verbosity.get(prop_id, 5)
+			if prop_id in always_build \
+				or (prop_id & 0x7C000000) >> 26 in NEVER_PRUNED_PROPERTY_TYPES:
+				# Never pruned
+				prune_verbosity = 0
+			else:
+				prune_verbosity = min(min_verbosity, PRUNED_PROPERTY_MIN_VERBOSITY)
+			plan.append((i, property_class, min_verbosity, prune_verbosity))
+			continue
+		return tuple(plan)
+
 	def __iter__(self):
 		# Iterate over all attributes recursively
+		for key in list(self._pruned_properties):
+			self.BuildPrunedProperty(key)
+			continue
 		for key, prop in self._properties.items():
 			for path, objs in prop:
 				yield (key, *path), (self, *objs)
@@ -277,6 +366,25 @@ class PropertySetObject:
 
 	PROPERTIES_ORDER = MakePropertiesOrder(PROPERTIES_VERBOSITY)
 
+	# These properties are used by the tree builders regardless of verbosity level,
+	# and are always built
+	ALWAYS_BUILD_PROPERTIES = frozenset((
+		int(PropertyID.LastModifiedTimeStamp),
+		int(PropertyID.AuthorMostRecent),
+		int(PropertyID.Author),
+		int(PropertyID.NotebookManagementEntityGuid),
+		int(PropertyID.CachedTitleString),
+		int(PropertyID.PageLevel),
+		int(PropertyID.HasConflictPages),
+		int(PropertyID.ConflictingUserName),
+		int(PropertyID.TopologyCreationTimeStamp),
+		int(PropertyID.ElementChildNodes),
+		int(PropertyID.ContentChildNodes),
+		int(PropertyID.ChildGraphSpaceElementNodes),
+		int(PropertyID.MetaDataObjectsAboveGraphSpace),
+		int(PropertyID.VersionHistoryGraphSpaceContextNodes),
+		))
+
 class jcidReadOnlyPersistablePropertyContainerForAuthor(PropertySetObject):
 	JCID = PropertySetJCID.jcidReadOnlyPersistablePropertyContainerForAuthor
 
@@ -357,7 +465,11 @@ class jcidRichTextOENode(PropertySetObject):
 		# The super-object only hashed attributes not ignored by verbosity level
 		# We heedn to hash the hext here
 		md5hash = md5(self.md5, usedforsecurity=False)
-		for prop_obj in self._properties.values():
+		for key, prop_obj in self._properties.items():
+			if key in self._pruned_properties:
+				if prop_obj.min_verbosity > TextRunFormattingVerbosity:
+					continue
+				prop_obj = self.BuildPrunedProperty(key, revision_ctx)
 			if prop_obj.min_verbosity == TextRunFormattingVerbosity:
 				prop_obj.update_hash(md5hash)
 			continue
@@ -493,9 +605,6 @@ class jcidEmbeddedFileContainer(PropertySetObject):
 		# file_data_object is a FileDataObject object, not PropertySet
 		# Locate binary data either in onestore.FileDataStoreList,
 		# or from a file in onefiles directory
-		md5hash = md5(usedforsecurity=False)
-		md5hash.update(self._jcid.jcid.to_bytes(4, byteorder='little', signed=False))
-
 		self._guid = str(file_data_object.guid)
 		self._extension = file_data_object.extension
 		if file_data_object.guid is not None:
@@ -508,14 +617,15 @@ class jcidEmbeddedFileContainer(PropertySetObject):
 		if data_ctx is not None:
 			self._data = data_ctx.GetData()
 			self._filename = data_ctx.GetFilename()
-			md5hash.update(self._filename.encode())
+			# The hash of the file is only calculated once
+			self.md5 = data_ctx.GetContentHash(self._jcid.jcid)
+		else:
+			md5hash = md5(usedforsecurity=False)
+			md5hash.update(self._jcid.jcid.to_bytes(4, byteorder='little', signed=False))
+			self.md5 = md5hash.digest()
 
 		if self._data:
 			self.min_verbosity = 0
-			md5hash.update(len(self._data).to_bytes(4, byteorder='little', signed=False))
-			md5hash.update(self._data)
-
-		self.md5 = md5hash.digest()
 		return
 
 class jcidPictureContainer14(jcidEmbeddedFileContainer):
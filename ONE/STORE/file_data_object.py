@@ -16,6 +16,7 @@
 from ..base_types import *
 from ..exception import UnrecognizedFileDataException
 from .property_set import PropertySet
+from hashlib import md5
 
 class FileDataObject(PropertySet):
 	def __init__(self, onestore, node):
@@ -54,6 +55,18 @@ class FileDataObject(PropertySet):
 	def GetFilename(self):
 		return self.data_filename
 
+	def GetRawDigest(self)->bytes:
+		# The file is identified by its reference and extension
+		digest = self._raw_digest
+		if digest is None:
+			md5hash = md5(usedforsecurity=False)
+			md5hash.update(self.jcid.jcid.to_bytes(4, byteorder='little', signed=False))
+			md5hash.update(self.reference.encode())
+			md5hash.update(self.extension.encode())
+			digest = md5hash.digest()
+			self._raw_digest = digest
+		return digest
+
 	def dump(self, fd, verbose=None):
 		super().dump(fd, verbose)
 
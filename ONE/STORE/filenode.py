@@ -13,6 +13,7 @@
 #   limitations under the License.
 #
 
+import struct
 from .reader import onestore_reader
 from ..base_types import *
 from ..exception import UnrecognizedFileNodeException, BaseTypeMismatchException, UnexpectedFileNodeException
@@ -71,11 +72,26 @@ class FileNodeID(IntEnum):
 	ChunkTerminatorFND = 0x0FF
 
 class FileNode:
+	__slots__ = ()
 	BaseType = 0
 	ID = NotImplemented
 	NAME = NotImplemented
+	# Layout of a fixed size node, following the FileNodeChunkReference (if any), in 'struct' format.
+	# The fields are passed to set_fields(). A variable size node sets FORMAT to None, and overrides __init__.
+	FORMAT = ''
+	STRUCT = struct.Struct('<')
+
+	def __init_subclass__(cls, **kwargs):
+		super().__init_subclass__(**kwargs)
+		if 'FORMAT' in cls.__dict__:
+			cls.STRUCT = struct.Struct('<' + cls.FORMAT) if cls.FORMAT is not None else None
+		return
 
 	def __init__(self, reader:onestore_reader):
+		self.set_fields(*reader.read_struct(self.STRUCT))
+		return
+
+	def set_fields(self):
 		return
 
 	def dump(self, fd, verbose=None):
@@ -83,16 +99,36 @@ class FileNode:
 		return
 
 class FileNode1(FileNode):
+	__slots__ = ('ref',)
 	BaseType = 1
 
+	def __init__(self, reader:onestore_reader, ref):
+		self.set_fields(ref, *reader.read_struct(self.STRUCT))
+		return
+
+	def set_fields(self, ref):
+		self.ref = ref
+		return
+
 class FileNode2(FileNode):
+	__slots__ = ('ref',)
 	BaseType = 2
 
+	def __init__(self, reader:onestore_reader, ref):
+		self.set_fields(ref, *reader.read_struct(self.STRUCT))
+		return
+
+	def set_fields(self, ref):
+		self.ref = ref
+		return
+
 class ObjectSpaceManifestRootFND(FileNode):
+	__slots__ = ('gosidRoot',)
 	ID = FileNodeID.ObjectSpaceManifestRootFND
+	FORMAT = '16sI'
 
-	def __init__(self, reader:onestore_reader):
-		self.gosidRoot = ExGUID().read(reader)
+	def set_fields(self, gosidRoot, n):
+		self.gosidRoot = InternExGUID(gosidRoot, n)
 		return
 
 	def dump(self, fd, verbose=None):
@@ -101,11 +137,13 @@ class ObjectSpaceManifestRootFND(FileNode):
 		return
 
 class ObjectSpaceManifestListReferenceFND(FileNode2):
+	__slots__ = ('gosid',)
 	ID = FileNodeID.ObjectSpaceManifestListReferenceFND
+	FORMAT = '16sI'
 
-	def __init__(self, reader, ref):
+	def set_fields(self, ref, gosid, n):
 		self.ref = ref
-		self.gosid = ExGUID().read(reader)
+		self.gosid = InternExGUID(gosid, n)
 		return
 
 	def dump(self, fd, verbose=None):
@@ -114,10 +152,12 @@ class ObjectSpaceManifestListReferenceFND(FileNode2):
 		return
 
 class ObjectSpaceManifestListStartFND(FileNode):
+	__slots__ = ('gosidRoot',)
 	ID = FileNodeID.ObjectSpaceManifestListStartFND
+	FORMAT = '16sI'
 
-	def __init__(self, reader:onestore_reader):
-		self.gosidRoot = ExGUID().read(reader)
+	def set_fields(self, gosidRoot, n):
+		self.gosidRoot = InternExGUID(gosidRoot, n)
 		return
 
 	def dump(self, fd, verbose=None):
@@ -126,18 +166,17 @@ class ObjectSpaceManifestListStartFND(FileNode):
 		return
 
 class RevisionManifestListReferenceFND(FileNode2):
+	__slots__ = ()
 	ID = FileNodeID.RevisionManifestListReferenceFND
 
-	def __init__(self, reader, ref):
-		self.ref = ref
-		return
-
 class RevisionManifestListStartFND(FileNode):
+	__slots__ = ('gosidRoot', 'nInstance')
 	ID = FileNodeID.RevisionManifestListStartFND
+	FORMAT = '16sII'
 
-	def __init__(self, reader:onestore_reader):
-		self.gosidRoot = ExGUID().read(reader)
-		self.nInstance = reader.read_uint32()	# always ignored
+	def set_fields(self, gosidRoot, n, nInstance):
+		self.gosidRoot = InternExGUID(gosidRoot, n)
+		self.nInstance = nInstance	# always ignored
 		return
 
 	def dump(self, fd, verbose=None):
@@ -148,14 +187,16 @@ class RevisionManifestListStartFND(FileNode):
 		return
 
 class RevisionManifestStart4FND(FileNode):
+	__slots__ = ('rid', 'ridDependent', 'timeCreation', 'RevisionRole', 'odcsDefault')
 	ID = FileNodeID.RevisionManifestStart4FND
+	FORMAT = '16sI16sIQIH'
 
-	def __init__(self, reader:onestore_reader):
-		self.rid = ExGUID().read(reader)
-		self.ridDependent = ExGUID().read(reader)
-		self.timeCreation = reader.read_uint64()	# always ignored
-		self.RevisionRole = reader.read_uint32()
-		self.odcsDefault = reader.read_uint16()	# always ignored
+	def set_fields(self, rid, n, ridDependent, nDependent, timeCreation, RevisionRole, odcsDefault):
+		self.rid = InternExGUID(rid, n)
+		self.ridDependent = InternExGUID(ridDependent, nDependent)
+		self.timeCreation = timeCreation	# always ignored
+		self.RevisionRole = RevisionRole
+		self.odcsDefault = odcsDefault	# always ignored
 		return
 
 	def dump(self, fd, verbose=None):
@@ -171,15 +212,17 @@ class RevisionManifestStart4FND(FileNode):
 		return
 
 class RevisionManifestStart6FND(FileNode):
+	__slots__ = ('rid', 'ridDependent', 'RevisionRole', 'odcsDefault')
 	ID = FileNodeID.RevisionManifestStart6FND
+	FORMAT = '16sI16sIIH'
 
-	def __init__(self, reader:onestore_reader):
-		self.rid = ExGUID().read(reader)
-		self.ridDependent = ExGUID().read(reader)
-		self.RevisionRole = reader.read_uint32()
+	def set_fields(self, rid, n, ridDependent, nDependent, RevisionRole, odcsDefault):
+		self.rid = InternExGUID(rid, n)
+		self.ridDependent = InternExGUID(ridDependent, nDependent)
+		self.RevisionRole = RevisionRole
 		# 0 - unencrypted;
 		# 2 - encrypted. Property sets within this revision manifest MUST be ignored and MUST NOT be altered.
-		self.odcsDefault = reader.read_uint16()
+		self.odcsDefault = odcsDefault
 		return
 
 	def dump(self, fd, verbose=None):
@@ -192,11 +235,13 @@ class RevisionManifestStart6FND(FileNode):
 		return
 
 class RevisionManifestStart7FND(RevisionManifestStart6FND):
+	__slots__ = ('gctxid',)
 	ID = FileNodeID.RevisionManifestStart7FND
+	FORMAT = RevisionManifestStart6FND.FORMAT + '16sI'
 
-	def __init__(self, reader):
-		super().__init__(reader)
-		self.gctxid = ExGUID().read(reader)
+	def set_fields(self, *fields):
+		super().set_fields(*fields[:-2])
+		self.gctxid = InternExGUID(*fields[-2:])
 		return
 
 	def dump(self, fd, verbose=None):
@@ -205,18 +250,22 @@ class RevisionManifestStart7FND(RevisionManifestStart6FND):
 		return
 
 class GlobalIdTableStartFNDX(FileNode):
+	__slots__ = ('Reserved',)
 	ID = FileNodeID.GlobalIdTableStartFNDX
+	FORMAT = '1s'
 
-	def __init__(self, reader:onestore_reader):
-		self.Reserved = reader.read_bytes(1)
+	def set_fields(self, Reserved):
+		self.Reserved = Reserved
 		return
 
 class GlobalIdTableEntryFNDX(FileNode):
+	__slots__ = ('index', 'guid')
 	ID = FileNodeID.GlobalIdTableEntryFNDX
+	FORMAT = 'I16s'
 
-	def __init__(self, reader:onestore_reader):
-		self.index = reader.read_uint32()
-		self.guid = GUID().read(reader)
+	def set_fields(self, index, guid):
+		self.index = index
+		self.guid = InternGUID(guid)
 		return
 
 	def dump(self, fd, verbose=None):
@@ -225,11 +274,13 @@ class GlobalIdTableEntryFNDX(FileNode):
 		return
 
 class GlobalIdTableEntry2FNDX(FileNode):
+	__slots__ = ('iIndexMapFrom', 'iIndexMapTo')
 	ID = FileNodeID.GlobalIdTableEntry2FNDX
+	FORMAT = 'II'
 
-	def __init__(self, reader:onestore_reader):
-		self.iIndexMapFrom = reader.read_uint32()
-		self.iIndexMapTo = reader.read_uint32()
+	def set_fields(self, iIndexMapFrom, iIndexMapTo):
+		self.iIndexMapFrom = iIndexMapFrom
+		self.iIndexMapTo = iIndexMapTo
 		return
 
 	def dump(self, fd, verbose=None):
@@ -238,12 +289,14 @@ class GlobalIdTableEntry2FNDX(FileNode):
 		return
 
 class GlobalIdTableEntry3FNDX(FileNode):
+	__slots__ = ('iIndexCopyFromStart', 'cEntriesToCopy', 'iIndexCopyToStart')
 	ID = FileNodeID.GlobalIdTableEntry3FNDX
+	FORMAT = 'III'
 
-	def __init__(self, reader:onestore_reader):
-		self.iIndexCopyFromStart = reader.read_uint32()
-		self.cEntriesToCopy = reader.read_uint32()
-		self.iIndexCopyToStart = reader.read_uint32()
+	def set_fields(self, iIndexCopyFromStart, cEntriesToCopy, iIndexCopyToStart):
+		self.iIndexCopyFromStart = iIndexCopyFromStart
+		self.cEntriesToCopy = cEntriesToCopy
+		self.iIndexCopyToStart = iIndexCopyToStart
 		return
 
 	def dump(self, fd, verbose=None):
@@ -252,13 +305,14 @@ class GlobalIdTableEntry3FNDX(FileNode):
 		return
 
 class ObjectRevisionWithRefCountFNDX(FileNode1):
+	__slots__ = ('jcid', 'coid', 'fHasOidReferences', 'fHasOsidReferences', 'prop_set', 'cRef')
 	ID = FileNodeID.ObjectRevisionWithRefCountFNDX
+	FORMAT = 'IB'
 
-	def __init__(self, reader, ref):
+	def set_fields(self, ref, coid, b):
 		self.jcid = None
 		self.ref = ref
-		self.coid = CompactID(reader)
-		b = reader.read_uint8()
+		self.coid = CompactID(word=coid)
 		self.fHasOidReferences = (b & 1) != 0
 		self.fHasOsidReferences = (b & 2) != 0
 		self.prop_set = None
@@ -278,25 +332,28 @@ class ObjectRevisionWithRefCountFNDX(FileNode1):
 		return
 
 class ObjectRevisionWithRefCount2FNDX(ObjectRevisionWithRefCountFNDX):
+	__slots__ = ()
 	ID = FileNodeID.ObjectRevisionWithRefCount2FNDX
+	FORMAT = 'III'
 
-	def __init__(self, reader, ref):
+	def set_fields(self, ref, coid, b, cRef):
 		self.jcid = None
 		self.ref = ref
-		self.coid = CompactID(reader)
-		b = reader.read_uint32()
+		self.coid = CompactID(word=coid)
 		self.fHasOidReferences = (b & 1) != 0
 		self.fHasOsidReferences = (b & 2) != 0
-		self.cRef = reader.read_uint32()
+		self.cRef = cRef
 		self.prop_set = None
 		return
 
 class RootObjectReference2FNDX(FileNode):
+	__slots__ = ('coidRoot', 'RootRole')
 	ID = FileNodeID.RootObjectReference2FNDX
+	FORMAT = 'II'
 
-	def __init__(self, reader:onestore_reader):
-		self.coidRoot = CompactID(reader)
-		self.RootRole = reader.read_uint32()
+	def set_fields(self, coidRoot, RootRole):
+		self.coidRoot = CompactID(word=coidRoot)
+		self.RootRole = RootRole
 		return
 
 	def dump(self, fd, verbose=None):
@@ -306,11 +363,13 @@ class RootObjectReference2FNDX(FileNode):
 		return
 
 class RootObjectReference3FND(FileNode):
+	__slots__ = ('oidRoot', 'RootRole')
 	ID = FileNodeID.RootObjectReference3FND
+	FORMAT = '16sII'
 
-	def __init__(self, reader:onestore_reader):
-		self.oidRoot = ExGUID().read(reader)
-		self.RootRole = reader.read_uint32()
+	def set_fields(self, oidRoot, n, RootRole):
+		self.oidRoot = InternExGUID(oidRoot, n)
+		self.RootRole = RootRole
 		return
 
 	def dump(self, fd, verbose=None):
@@ -320,11 +379,13 @@ class RootObjectReference3FND(FileNode):
 		return
 
 class RevisionRoleDeclarationFND(FileNode):
+	__slots__ = ('rid', 'RevisionRole')
 	ID = FileNodeID.RevisionRoleDeclarationFND
+	FORMAT = '16sII'
 
-	def __init__(self, reader:onestore_reader):
-		self.rid = ExGUID().read(reader)
-		self.RevisionRole = reader.read_uint32()
+	def set_fields(self, rid, n, RevisionRole):
+		self.rid = InternExGUID(rid, n)
+		self.RevisionRole = RevisionRole
 		return
 
 	def dump(self, fd, verbose=None):
@@ -334,11 +395,13 @@ class RevisionRoleDeclarationFND(FileNode):
 		return
 
 class RevisionRoleAndContextDeclarationFND(RevisionRoleDeclarationFND):
+	__slots__ = ('gctxid',)
 	ID = FileNodeID.RevisionRoleAndContextDeclarationFND
+	FORMAT = RevisionRoleDeclarationFND.FORMAT + '16sI'
 
-	def __init__(self, reader):
-		super().__init__(reader)
-		self.gctxid = ExGUID().read(reader)
+	def set_fields(self, *fields):
+		super().set_fields(*fields[:-2])
+		self.gctxid = InternExGUID(*fields[-2:])
 		return
 
 	def dump(self, fd, verbose=None):
@@ -347,13 +410,11 @@ class RevisionRoleAndContextDeclarationFND(RevisionRoleDeclarationFND):
 		return
 
 class ObjectDataEncryptionKeyV2FNDX(FileNode1):
+	__slots__ = ()
 	ID = FileNodeID.ObjectDataEncryptionKeyV2FNDX
 
-	def __init__(self, reader, ref):
-		self.ref = ref
-		return
-
 class ObjectInfoDependencyOverride8:
+	__slots__ = ('coid', 'cRef')
 
 	def __init__(self, reader:onestore_reader):
 		self.coid = CompactID(reader)
@@ -361,6 +422,7 @@ class ObjectInfoDependencyOverride8:
 		return
 
 class ObjectInfoDependencyOverride32:
+	__slots__ = ('coid', 'cRef')
 
 	def __init__(self, reader:onestore_reader):
 		self.coid = CompactID(reader)
@@ -368,6 +430,7 @@ class ObjectInfoDependencyOverride32:
 		return
 
 class ObjectInfoDependencyOverrideData:
+	__slots__ = ('crc', 'overrides')
 
 	def __init__(self, reader:onestore_reader):
 		c8BitOverrides = reader.read_uint32()
@@ -385,7 +448,9 @@ class ObjectInfoDependencyOverrideData:
 		return
 
 class ObjectInfoDependencyOverridesFND(FileNode1):
+	__slots__ = ('overrides',)
 	ID = FileNodeID.ObjectInfoDependencyOverridesFND
+	FORMAT = None
 
 	def __init__(self, reader, ref):
 		self.ref = ref
@@ -396,18 +461,17 @@ class ObjectInfoDependencyOverridesFND(FileNode1):
 		return
 
 class FileDataStoreListReferenceFND(FileNode2):
+	__slots__ = ()
 	ID = FileNodeID.FileDataStoreListReferenceFND
 
-	def __init__(self, reader, ref):
-		self.ref = ref
-		return
-
 class FileDataStoreObjectReferenceFND(FileNode1):
+	__slots__ = ('guidReference', 'data_store_object')
 	ID = FileNodeID.FileDataStoreObjectReferenceFND
+	FORMAT = '16s'
 
-	def __init__(self, reader, ref):
+	def set_fields(self, ref, guidReference):
 		self.ref = ref
-		self.guidReference = GUID().read(reader)
+		self.guidReference = InternGUID(guidReference)
 		self.data_store_object = None
 		return
 
@@ -419,11 +483,11 @@ class FileDataStoreObjectReferenceFND(FileNode1):
 		return
 
 class ObjectDeclarationWithRefCountBody:
+	__slots__ = ('coid', 'jcid', 'odcs', 'fHasOidReferences', 'fHasOsidReferences')
 
-	def __init__(self, reader:onestore_reader):
-		self.coid = CompactID(reader)
+	def __init__(self, coid:int, w:int, flags:int):
+		self.coid = CompactID(word=coid)
 
-		w = reader.read_uint16()
 		jci = w & 0x3FF
 		assert(jci == 1)
 		# When only index is specified, the other fields of JCID MUST be implied as set to:
@@ -434,9 +498,8 @@ class ObjectDeclarationWithRefCountBody:
 		#  and JCID.IsReadOnly = "false".
 		self.jcid = JCID(jci | 0x00020000)
 		self.odcs = w & 0x3C00
-		w = reader.read_uint32()
-		self.fHasOidReferences = (w & 1) != 0
-		self.fHasOsidReferences = (w & 2) != 0
+		self.fHasOidReferences = (flags & 1) != 0
+		self.fHasOsidReferences = (flags & 2) != 0
 		return
 
 	def dump(self, fd, verbose=None):
@@ -447,13 +510,15 @@ class ObjectDeclarationWithRefCountBody:
 		return
 
 class ObjectDeclarationWithRefCountFNDX(FileNode1):
+	__slots__ = ('ObjectRef', 'body', 'cRef', 'prop_set')
 	ID = FileNodeID.ObjectDeclarationWithRefCountFNDX
-	cRefReadFunc = onestore_reader.read_uint8
+	# ObjectDeclarationWithRefCountBody, cRef
+	FORMAT = 'IHIB'
 
-	def __init__(self, reader, ref):
+	def set_fields(self, ref, coid, w, flags, cRef):
 		self.ObjectRef = ref
-		self.body = ObjectDeclarationWithRefCountBody(reader)
-		self.cRef = type(self).cRefReadFunc(reader)
+		self.body = ObjectDeclarationWithRefCountBody(coid, w, flags)
+		self.cRef = cRef
 		self.prop_set = None
 		return
 
@@ -466,15 +531,18 @@ class ObjectDeclarationWithRefCountFNDX(FileNode1):
 		return
 
 class ObjectDeclarationWithRefCount2FNDX(ObjectDeclarationWithRefCountFNDX):
+	__slots__ = ()
 	ID = FileNodeID.ObjectDeclarationWithRefCount2FNDX
-	cRefReadFunc = onestore_reader.read_uint32
+	FORMAT = 'IHII'
 
 class HashedChunkDescriptor2FND(FileNode1):
+	__slots__ = ('BlobRef', 'guidHash')
 	ID = FileNodeID.HashedChunkDescriptor2FND
+	FORMAT = '16s'
 
-	def __init__(self, reader, ref):
+	def set_fields(self, ref, guidHash):
 		self.BlobRef = ref
-		self.guidHash = GUID().read(reader)
+		self.guidHash = InternGUID(guidHash)
 		return
 
 	def dump(self, fd, verbose=None):
@@ -483,14 +551,14 @@ class HashedChunkDescriptor2FND(FileNode1):
 		return
 
 class ObjectDeclaration2Body:
+	__slots__ = ('coid', 'jcid', 'fHasOidReferences', 'fHasOsidReferences')
 
-	def __init__(self, reader:onestore_reader):
-		self.coid = CompactID(reader)
-		self.jcid = JCID().read(reader)
+	def __init__(self, coid:int, jcid:int, flags:int):
+		self.coid = CompactID(word=coid)
+		self.jcid = JCID(jcid)
 
-		w = reader.read_uint8()
-		self.fHasOidReferences = (w & 1) != 0
-		self.fHasOsidReferences = (w & 2) != 0
+		self.fHasOidReferences = (flags & 1) != 0
+		self.fHasOsidReferences = (flags & 2) != 0
 		return
 
 	def dump(self, fd, verbose=None):
@@ -499,13 +567,15 @@ class ObjectDeclaration2Body:
 		return
 
 class ObjectDeclaration2RefCountFND(FileNode1):
+	__slots__ = ('BlobRef', 'body', 'cRef', 'md5Hash', 'prop_set')
 	ID = FileNodeID.ObjectDeclaration2RefCountFND
-	cRefReadFunc = onestore_reader.read_uint8
+	# ObjectDeclaration2Body, cRef
+	FORMAT = 'IIBB'
 
-	def __init__(self, reader, ref):
+	def set_fields(self, ref, coid, jcid, flags, cRef):
 		self.BlobRef = ref
-		self.body = ObjectDeclaration2Body(reader)
-		self.cRef = type(self).cRefReadFunc(reader)
+		self.body = ObjectDeclaration2Body(coid, jcid, flags)
+		self.cRef = cRef
 		self.md5Hash = None
 		self.prop_set = None
 		return
@@ -521,25 +591,32 @@ class ObjectDeclaration2RefCountFND(FileNode1):
 		return
 
 class ObjectDeclaration2LargeRefCountFND(ObjectDeclaration2RefCountFND):
+	__slots__ = ()
 	ID = FileNodeID.ObjectDeclaration2LargeRefCountFND
-	cRefReadFunc = onestore_reader.read_uint32
+	FORMAT = 'IIBI'
 
 class ReadOnlyObjectDeclaration2RefCountFND(ObjectDeclaration2RefCountFND):
+	__slots__ = ()
 	ID = FileNodeID.ReadOnlyObjectDeclaration2RefCountFND
+	# ObjectDeclaration2RefCountFND, md5Hash
+	FORMAT = ObjectDeclaration2RefCountFND.FORMAT + '16s'
 
-	def __init__(self, reader, ref):
-		super().__init__(reader, ref)
+	def set_fields(self, *fields):
+		super().set_fields(*fields[:-1])
 		assert(self.body.jcid.IsPropertySet)
 		assert(self.body.jcid.IsReadOnly)
-		self.md5Hash = reader.read_bytes(16)
+		self.md5Hash = fields[-1]
 		return
 
 class ReadOnlyObjectDeclaration2LargeRefCountFND(ReadOnlyObjectDeclaration2RefCountFND):
+	__slots__ = ()
 	ID = FileNodeID.ReadOnlyObjectDeclaration2LargeRefCountFND
-	cRefReadFunc = onestore_reader.read_uint32
+	FORMAT = ObjectDeclaration2LargeRefCountFND.FORMAT + '16s'
 
 class ObjectDeclarationFileData3RefCountFND(FileNode):
+	__slots__ = ('data_store_object', 'coid', 'jcid', 'cRef', 'FileDataReference', 'Extension')
 	ID = FileNodeID.ObjectDeclarationFileData3RefCountFND
+	FORMAT = None
 	cRefReadFunc = onestore_reader.read_uint8
 
 	def __init__(self, reader:onestore_reader):
@@ -565,15 +642,18 @@ class ObjectDeclarationFileData3RefCountFND(FileNode):
 		return
 
 class ObjectDeclarationFileData3LargeRefCountFND(ObjectDeclarationFileData3RefCountFND):
+	__slots__ = ()
 	ID = FileNodeID.ObjectDeclarationFileData3LargeRefCountFND
 	cRefReadFunc = onestore_reader.read_uint32
 
 class ObjectGroupListReferenceFND(FileNode2):
+	__slots__ = ('ObjectGroupID',)
 	ID = FileNodeID.ObjectGroupListReferenceFND
+	FORMAT = '16sI'
 
-	def __init__(self, reader, ref):
+	def set_fields(self, ref, ObjectGroupID, n):
 		self.ref = ref
-		self.ObjectGroupID = ExGUID().read(reader)
+		self.ObjectGroupID = InternExGUID(ObjectGroupID, n)
 		return
 
 	def dump(self, fd, verbose=None):
@@ -582,10 +662,12 @@ class ObjectGroupListReferenceFND(FileNode2):
 		return
 
 class ObjectGroupStartFND(FileNode):
+	__slots__ = ('ogid',)
 	ID = FileNodeID.ObjectGroupStartFND
+	FORMAT = '16sI'
 
-	def __init__(self, reader:onestore_reader):
-		self.ogid = ExGUID().read(reader)
+	def set_fields(self, ogid, n):
+		self.ogid = InternExGUID(ogid, n)
 		return
 
 	def dump(self, fd, verbose=None):
@@ -594,10 +676,12 @@ class ObjectGroupStartFND(FileNode):
 		return
 
 class DataSignatureGroupDefinitionFND(FileNode):
+	__slots__ = ('DataSignatureGroup',)
 	ID = FileNodeID.DataSignatureGroupDefinitionFND
+	FORMAT = '16sI'
 
-	def __init__(self, reader:onestore_reader):
-		self.DataSignatureGroup = ExGUID().read(reader)
+	def set_fields(self, DataSignatureGroup, n):
+		self.DataSignatureGroup = InternExGUID(DataSignatureGroup, n)
 		return
 
 	def dump(self, fd, verbose=None):
@@ -606,18 +690,23 @@ class DataSignatureGroupDefinitionFND(FileNode):
 		return
 
 class RevisionManifestEndFND(FileNode):
+	__slots__ = ()
 	ID = FileNodeID.RevisionManifestEndFND
 
 class GlobalIdTableStart2FND(FileNode):
+	__slots__ = ()
 	ID = FileNodeID.GlobalIdTableStart2FND
 
 class GlobalIdTableEndFNDX(FileNode):
+	__slots__ = ()
 	ID = FileNodeID.GlobalIdTableEndFNDX
 
 class ObjectGroupEndFND(FileNode):
+	__slots__ = ()
 	ID = FileNodeID.ObjectGroupEndFND
 
 class ChunkTerminatorFND(FileNode):
+	__slots__ = ()
 	ID = FileNodeID.ChunkTerminatorFND
 
 FileNodeFactoryDict = {
@@ -662,10 +751,61 @@ FileNodeFactoryDict = {
 	int(FileNodeID.ChunkTerminatorFND) : ChunkTerminatorFND,
 	}
 
+# Mask of the file node header bits, which select a decoder: all, except for Size
+FILE_NODE_DECODER_KEY_MASK = 0xFF8003FF
+
+def MakeFileNodeDecoders():
+	'''
+	Builds a table of decoders for fixed size file nodes, indexed by the file node header bits
+	(FileNodeID, StpFormat, CbFormat, BaseType, and the valid bit), except for the node size.
+	Each decoder is a tuple of the node class, 'struct' of the whole node data,
+	including the FileNodeChunkReference, if any, and the chunk reference decoder function.
+	'''
+	decoders = {}
+	for file_node_id, FileNodeClass in FileNodeFactoryDict.items():
+		if FileNodeClass.STRUCT is None:
+			continue
+
+		key = 0x80000000 | (FileNodeClass.BaseType << 27) | file_node_id
+		if FileNodeClass.BaseType == 0:
+			decoders[key] = (FileNodeClass, FileNodeClass.STRUCT, None)
+			continue
+
+		for StpFormat in range(4):
+			for CbFormat in range(4):
+				ref_struct, decode_ref = FileNodeChunkReferenceDecoders[StpFormat][CbFormat]
+				# Struct.format includes the '<' prefix
+				node_struct = struct.Struct(ref_struct.format + FileNodeClass.FORMAT)
+				decoders[key | (CbFormat << 25) | (StpFormat << 23)] = (FileNodeClass, node_struct, decode_ref)
+				continue
+			continue
+		continue
+	return decoders
+
+FileNodeDecoders = MakeFileNodeDecoders()
+
 def FileNodeFactory(reader:onestore_reader, allowed_nodes:set=None):
 	start_offset = reader.get_offset()
 	hdr = reader.read_uint32()
 
+	# Fast path for fixed size nodes: a single dispatch and a single unpack.
+	# Anything unusual goes to the generic path below, to raise a proper exception
+	decoder = FileNodeDecoders.get(hdr & FILE_NODE_DECODER_KEY_MASK, None)
+	if decoder is not None:
+		FileNodeClass, node_struct, decode_ref = decoder
+		file_node_id = hdr & 0x3FF
+		if ((hdr >> 10) & 0x1FFF) == node_struct.size + 4 \
+			and (allowed_nodes is None or file_node_id in allowed_nodes \
+				or file_node_id == FileNodeID.ChunkTerminatorFND.value):
+			fields = reader.read_struct(node_struct)
+			file_node_object = FileNodeClass.__new__(FileNodeClass)
+			if decode_ref is None:
+				file_node_object.set_fields(*fields)
+			else:
+				stp, cb = decode_ref(fields[0], fields[1])
+				file_node_object.set_fields(FileNodeChunkReference(stp=stp, cb=cb), *fields[2:])
+			return file_node_object
+
 	if (hdr & 0x80000000) == 0:
 		return None
 
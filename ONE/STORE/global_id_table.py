@@ -22,24 +22,26 @@ ID_GlobalIdTableEntryFNDX = ID.GlobalIdTableEntryFNDX.value
 ID_GlobalIdTableEntry2FNDX = ID.GlobalIdTableEntry2FNDX.value
 ID_GlobalIdTableEntry3FNDX = ID.GlobalIdTableEntry3FNDX.value
 
+# If an index is this far past the end of the table (or more than the table length, if that's bigger),
+# the table is considered sparse, and switched from a list to a dictionary
+SPARSE_TABLE_GAP = 0x400
+
 class GlobalIdTable:
 	def __init__(self, node_iter, prev_global_id_table):
-		self.table = {}
+		# GUID indices are normally dense small integers. The table is a list, with None in unused slots.
+		# A sparse table is kept in a dictionary by index instead
+		self.table:list[GUID]|dict[int,GUID] = []
 		node = next(node_iter)
 
 		while node.ID != ID_GlobalIdTableEndFNDX:
 			if node.ID == ID_GlobalIdTableEntryFNDX:
-				self.table[node.index] = node.guid
+				self.SetRange(node.index, [node.guid])
 			elif node.ID == ID_GlobalIdTableEntry2FNDX:
-				self.table[node.iIndexMapTo] = prev_global_id_table.table[node.iIndexMapFrom]
+				self.SetRange(node.iIndexMapTo,
+					prev_global_id_table.GetRange(node.iIndexMapFrom, 1))
 			elif node.ID == ID_GlobalIdTableEntry3FNDX:
-				iIndexCopyFrom = node.iIndexCopyFromStart
-				cEntriesToCopy = node.cEntriesToCopy
-				iIndexCopyTo = node.iIndexCopyToStart
-				for _ in range(cEntriesToCopy):
-					self.table[iIndexCopyTo] = prev_global_id_table.table[iIndexCopyFrom]
-					iIndexCopyFrom += 1
-					iIndexCopyTo += 1
+				self.SetRange(node.iIndexCopyToStart,
+					prev_global_id_table.GetRange(node.iIndexCopyFromStart, node.cEntriesToCopy))
 			else:
 				# The global ID table is present in the middle of a node stream,
 				# we cannot rely on allowed nodes list to catch anomalies
@@ -49,5 +51,54 @@ class GlobalIdTable:
 
 		return
 
+	def IsSparse(self):
+		return type(self.table) is dict
+
+	def GetRange(self, start:int, count:int)->list[GUID]:
+		table = self.table
+		if count > len(table):
+			# Can't have that many entries
+			raise KeyError(start)
+		if type(table) is list:
+			guids = table[start:start + count]
+		else:
+			guids = [table.get(index, None) for index in range(start, start + count)]
+		if len(guids) != count or any(guid is None for guid in guids):
+			raise KeyError(start)
+		return guids
+
+	def SetRange(self, start:int, guids:list[GUID]):
+		end = start + len(guids)
+		# CompactID can only refer to 24 bit index
+		assert(end <= 0x1000000)
+		table = self.table
+		if type(table) is list:
+			length = len(table)
+			if end <= length:
+				table[start:end] = guids
+				return
+			if end - length <= max(length, SPARSE_TABLE_GAP):
+				table.extend([None] * (end - length))
+				table[start:end] = guids
+				return
+			# Don't allocate the slots all the way to a far index
+			table = {index : guid for index, guid in enumerate(table) if guid is not None}
+			self.table = table
+
+		for index, guid in enumerate(guids, start):
+			table[index] = guid
+			continue
+		return
+
+	def GetExGUID(self, index:int, n:int)->ExGUID:
+		try:
+			guid = self.table[index]
+		except LookupError:
+			# IndexError from the list, KeyError from the dictionary
+			guid = None
+		if guid is None:
+			raise KeyError(index)
+		return InternExGUID(guid.guid, n)
+
 	def __getitem__(self, compact_id:CompactID):
-		return ExGUID(self.table[compact_id.guidIndex].guid, compact_id.n)
+		return self.GetExGUID(compact_id.guidIndex, compact_id.n)
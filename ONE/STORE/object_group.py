@@ -15,7 +15,7 @@
 
 from ..base_types import *
 from ..exception import UnexpectedFileNodeException
-from .property_set import ObjectSpaceObjectPropSet
+from .property_set import ObjectSpaceObjectPropSet, LazyObjectSpaceObjectPropSet
 from .filenode import FileNodeID as ID
 from .global_id_table import GlobalIdTable
 from .file_data_object import FileDataObject
@@ -66,6 +66,11 @@ class ObjectGroup:
 			raise UnexpectedFileNodeException("Unexpected file node %s in Object Group %s NodeList" % (node.ID.name, self.ObjectGroupID))
 		self.global_id_table = GlobalIdTable(node_iter, None)
 
+		if onestore.lazy:
+			MakePropSet = LazyObjectSpaceObjectPropSet
+		else:
+			MakePropSet = ObjectSpaceObjectPropSet
+
 		for node in node_iter:
 			nid = node.ID.value
 			if nid == ID_DataSignatureGroupDefinitionFND:
@@ -92,7 +97,7 @@ class ObjectGroup:
 			# FileNodeList will raise UnexpectedFileNodeException if any other node ID is read
 
 			oid = self.global_id_table[node.body.coid]
-			obj = ObjectSpaceObjectPropSet(onestore, node.BlobRef, node.body.jcid, self.global_id_table, revision.encryption_key)
+			obj = MakePropSet(onestore, node.BlobRef, node.body.jcid, self.global_id_table, revision.encryption_key)
 			node.prop_set = obj
 			revision.AddObject(oid, obj, node.md5Hash)
 			continue
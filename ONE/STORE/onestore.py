@@ -14,11 +14,19 @@
 #
 
 from __future__ import annotations
+import os
+import sys
+import struct
 from types import SimpleNamespace
 from ..base_types import *
 from .reader import onestore_reader
 from ..exception import UnrecognizedFileFormatException
 from ..exception import UnexpectedFileNodeException
+from ..exception import FileClosedException
+from ..exception import EndOfBufferException
+
+# Embedded file data is copied out in pieces of this size, when it can't be copied file to file
+FILE_DATA_COPY_CHUNK = 0x100000
 
 class FileDataStoreObject:
 	guidHeader = GUID("{BDE316E7-2665-4511-A4C4-8D4D0B7A9EAC}")
@@ -34,58 +42,132 @@ class FileDataStoreObject:
 		reader_tail = reader.extract(-16)
 		guidFooter = GUID().read(reader_tail)
 		assert(guidFooter == self.guidFooter)
-		self.FileData = reader.read_bytes(cbLength)
+		# Only the position of the file data is kept; it's not copied
+		self.onestore = onestore
+		self.FileDataOffset = ref.stp + reader.get_offset()
+		self.FileDataLength = cbLength
+		reader.skip(cbLength)
 		assert(reader.remaining() < 8)
 		assert(0 == (reader.length & 7))
 		return
 
-	def GetData(self):
-		return self.FileData
+	def GetData(self)->memoryview:
+		# A view of the source file data, without copying
+		self.onestore.CheckNotClosed()
+		offset = self.FileDataOffset
+		return self.onestore.data[offset:offset + self.FileDataLength]
+
+	def WriteFile(self, path):
+		# Writes the data to a file, without making a copy in memory.
+		# If possible, the data is copied from the source file to the destination file by the OS
+		self.onestore.CheckNotClosed()
+		offset = self.FileDataOffset
+		remaining = self.FileDataLength
+		with open(path, 'wb', buffering=0) as fd:
+			filename = self.onestore.filename
+			if filename is not None and hasattr(os, 'copy_file_range'):
+				try:
+					with open(filename, 'rb') as src_fd:
+						while remaining > 0:
+							copied = os.copy_file_range(src_fd.fileno(), fd.fileno(), remaining, offset)
+							if copied == 0:
+								break
+							offset += copied
+							remaining -= copied
+							continue
+				except OSError:
+					# Not supported for these files; copy the rest below
+					pass
+
+			data = self.onestore.data
+			while remaining > 0:
+				length = min(remaining, FILE_DATA_COPY_CHUNK)
+				chunk = data[offset:offset + length]
+				if len(chunk) != length:
+					raise EndOfBufferException("Attempted read of 0x%X bytes of file data at offset 0x%X with only 0x%X bytes remaining"
+											% (length, offset, len(chunk)))
+				written = fd.write(chunk)
+				if not written:
+					raise OSError("Unable to write file data to %s" % (path,))
+				offset += written
+				remaining -= written
+				continue
+		return
 
-	def dump(self, fd):
-		print(" Length=%d" % (len(self.FileData),), file=fd)
+	def dump(self, fd, verbose=None):
+		print(" Length=%d" % (self.FileDataLength,), file=fd)
 		return
 
 class OneStoreFileHeader:
+	# All fields of the header, up to the reserved area
+	STRUCT = struct.Struct('<'
+			'16s16s16s16s'	# guidFileType, guidFile, guidLegacyFileVersion, guidFileFormat
+			'IIII'			# ffvLastCodeThatWroteToThisFile ... ffvOldestCodeThatMayReadThisFile
+			'IIII'			# fcrLegacyFreeChunkList, fcrLegacyTransactionLog
+			'IIQ'			# cTransactionsInLog, cbLegacyExpectedFileLength, rgbPlaceholder
+			'II'			# fcrLegacyFileNodeListRoot
+			'IBBBB'			# cbLegacyFreeSpaceInFreeChunkList, fNeedsDefrag ... fHasNoEmbeddedFileObjects
+			'16sI'			# guidAncestor, crcName
+			'QIQIQIQI'		# fcrHashedChunkList, fcrTransactionLog, fcrFileNodeListRoot, fcrFreeChunkList
+			'QQ'			# cbExpectedFileLength, cbFreeSpaceInFreeChunkList
+			'16sQ16sI'		# guidFileVersion, nFileVersionGeneration, guidDenyReadFileVersion, grfDebugLogFlags
+			'QIQI'			# fcrDebugLog, fcrAllocVerificationFreeChunkList
+			'IIII'			# bnCreated, bnLastWroteToThisFile, bnOldestWritten, bnNewestWritten
+			)
 
 	def __init__(self, fd):
-		self.guidFileType = GUID().read(fd)
-		self.guidFile = GUID().read(fd)
-		self.guidLegacyFileVersion = GUID().read(fd)
-		self.guidFileFormat = GUID().read(fd)
-		self.ffvLastCodeThatWroteToThisFile = fd.read_uint32()
-		self.ffvOldestCodeThatHasWrittenToThisFile = fd.read_uint32()
-		self.ffvNewestCodeThatHasWrittenToThisFile = fd.read_uint32()
-		self.ffvOldestCodeThatMayReadThisFile = fd.read_uint32()
-		self.fcrLegacyFreeChunkList = FileChunkReference32(fd)
-		self.fcrLegacyTransactionLog = FileChunkReference32(fd)
-		self.cTransactionsInLog = fd.read_uint32()
-		self.cbLegacyExpectedFileLength = fd.read_uint32()
-		self.rgbPlaceholder = fd.read_uint64()
-		self.fcrLegacyFileNodeListRoot = FileChunkReference32(fd)
-		self.cbLegacyFreeSpaceInFreeChunkList = fd.read_uint32()
-		self.fNeedsDefrag = fd.read_uint8()
-		self.fRepairedFile = fd.read_uint8()
-		self.fNeedsGarbageCollect = fd.read_uint8()
-		self.fHasNoEmbeddedFileObjects = fd.read_uint8()
-		self.guidAncestor = GUID().read(fd)
-		self.crcName = fd.read_uint32()
-		self.fcrHashedChunkList = FileChunkReference64x32(fd)
-		self.fcrTransactionLog = FileChunkReference64x32(fd)
-		self.fcrFileNodeListRoot = FileChunkReference64x32(fd)
-		self.fcrFreeChunkList = FileChunkReference64x32(fd)
-		self.cbExpectedFileLength = fd.read_uint64()
-		self.cbFreeSpaceInFreeChunkList = fd.read_uint64()
-		self.guidFileVersion = GUID().read(fd)
-		self.nFileVersionGeneration = fd.read_uint64()
-		self.guidDenyReadFileVersion = GUID().read(fd)
-		self.grfDebugLogFlags = fd.read_uint32()
-		self.fcrDebugLog = FileChunkReference64x32(fd)
-		self.fcrAllocVerificationFreeChunkList = FileChunkReference64x32(fd)
-		self.bnCreated = fd.read_uint32()
-		self.bnLastWroteToThisFile = fd.read_uint32()
-		self.bnOldestWritten = fd.read_uint32()
-		self.bnNewestWritten = fd.read_uint32()
+		(guidFileType, guidFile, guidLegacyFileVersion, guidFileFormat,
+			self.ffvLastCodeThatWroteToThisFile,
+			self.ffvOldestCodeThatHasWrittenToThisFile,
+			self.ffvNewestCodeThatHasWrittenToThisFile,
+			self.ffvOldestCodeThatMayReadThisFile,
+			stpLegacyFreeChunkList, cbLegacyFreeChunkList,
+			stpLegacyTransactionLog, cbLegacyTransactionLog,
+			self.cTransactionsInLog,
+			self.cbLegacyExpectedFileLength,
+			self.rgbPlaceholder,
+			stpLegacyFileNodeListRoot, cbLegacyFileNodeListRoot,
+			self.cbLegacyFreeSpaceInFreeChunkList,
+			self.fNeedsDefrag,
+			self.fRepairedFile,
+			self.fNeedsGarbageCollect,
+			self.fHasNoEmbeddedFileObjects,
+			guidAncestor,
+			self.crcName,
+			stpHashedChunkList, cbHashedChunkList,
+			stpTransactionLog, cbTransactionLog,
+			stpFileNodeListRoot, cbFileNodeListRoot,
+			stpFreeChunkList, cbFreeChunkList,
+			self.cbExpectedFileLength,
+			self.cbFreeSpaceInFreeChunkList,
+			guidFileVersion,
+			self.nFileVersionGeneration,
+			guidDenyReadFileVersion,
+			self.grfDebugLogFlags,
+			stpDebugLog, cbDebugLog,
+			stpAllocVerificationFreeChunkList, cbAllocVerificationFreeChunkList,
+			self.bnCreated,
+			self.bnLastWroteToThisFile,
+			self.bnOldestWritten,
+			self.bnNewestWritten,
+			) = fd.read_struct(self.STRUCT)
+
+		self.guidFileType = GUID(guidFileType)
+		self.guidFile = GUID(guidFile)
+		self.guidLegacyFileVersion = GUID(guidLegacyFileVersion)
+		self.guidFileFormat = GUID(guidFileFormat)
+		self.fcrLegacyFreeChunkList = FileChunkReference32(stp=stpLegacyFreeChunkList, cb=cbLegacyFreeChunkList)
+		self.fcrLegacyTransactionLog = FileChunkReference32(stp=stpLegacyTransactionLog, cb=cbLegacyTransactionLog)
+		self.fcrLegacyFileNodeListRoot = FileChunkReference32(stp=stpLegacyFileNodeListRoot, cb=cbLegacyFileNodeListRoot)
+		self.guidAncestor = GUID(guidAncestor)
+		self.fcrHashedChunkList = FileChunkReference64x32(stp=stpHashedChunkList, cb=cbHashedChunkList)
+		self.fcrTransactionLog = FileChunkReference64x32(stp=stpTransactionLog, cb=cbTransactionLog)
+		self.fcrFileNodeListRoot = FileChunkReference64x32(stp=stpFileNodeListRoot, cb=cbFileNodeListRoot)
+		self.fcrFreeChunkList = FileChunkReference64x32(stp=stpFreeChunkList, cb=cbFreeChunkList)
+		self.guidFileVersion = GUID(guidFileVersion)
+		self.guidDenyReadFileVersion = GUID(guidDenyReadFileVersion)
+		self.fcrDebugLog = FileChunkReference64x32(stp=stpDebugLog, cb=cbDebugLog)
+		self.fcrAllocVerificationFreeChunkList = FileChunkReference64x32(stp=stpAllocVerificationFreeChunkList, cb=cbAllocVerificationFreeChunkList)
 		return
 
 	def dump(self, fd):
@@ -110,17 +192,27 @@ class OneStoreFile:
 	onenote2_file_type_guid = GUID('{43FF2FA1-EFD9-4C76-9EE2-10EA5722765F}')
 	_one_section = 1
 	_one_toc2 = 2
+	# Number of files not closed yet. The GUID intern tables are shared by all of them,
+	# and cleared when the last file is closed
+	open_files = 0
 
 	def __init__(self, filename, data:bytes, options=None, log_file=None):
 
 		self.filename = filename
-		self.data = data
+		# 'data' can be 'bytes' or a read-only 'mmap' object, see open().
+		# All readers work over the single memoryview of it, to avoid copying
+		self.data = memoryview(data)
+		self.closed = False
+		OneStoreFile.open_files += 1
 		self.options = options
 		self.log_file = log_file
 		self.RootObjectSpaceId = None
 		self.FileDataStoreList = None
 		self.OnefileDir = {}
+		# Object spaces are loaded on first access by GetObjectSpace(). Until then,
+		# the ObjectSpaces value is None, and the file node list reference is kept in ObjectSpaceRefs
 		self.ObjectSpaces = {}
+		self.ObjectSpaceRefs = {}
 
 		verbose = getattr(options, 'verbose', None)
 		if verbose is None:
@@ -132,8 +224,10 @@ class OneStoreFile:
 			verbose.pretty_jcid_type=PropertySetJCID
 			verbose.pretty_print_properties = True
 		self.verbose = verbose
+		# Property set objects are decoded on first access
+		self.lazy = getattr(options, 'lazy', False)
 
-		self.header = OneStoreFileHeader(onestore_reader(data, 1024, 0))
+		self.header = OneStoreFileHeader(onestore_reader(self.data, 1024, 0))
 
 		if self.header.guidFileType == self.one_section_file_type_guid:
 			self.file_format = self._one_section
@@ -142,16 +236,24 @@ class OneStoreFile:
 		else:
 			raise UnrecognizedFileFormatException("Unrecognised guidFileType: %s" % (self.header.guidFileType,))
 
+		if getattr(options, 'prefetch', False):
+			from .prefetch import PrefetchPlanner
+			PrefetchPlanner(self).Run(self.header.fcrFileNodeListRoot)
+
 		try:
 			self.ReadRootFileNodeList(self.header)
 		except UnexpectedFileNodeException as e:
-			if self.IsNotebookSection():
-				e.args = (str(e) + ' in ".one" file',)
-			elif self.IsNotebookToc2():
-				e.args = (str(e) + ' in ".onetoc2" file',)
+			self.AddFileTypeToException(e)
 			raise
 		return
 
+	def AddFileTypeToException(self, e):
+		if self.IsNotebookSection():
+			e.args = (str(e) + ' in ".one" file',)
+		elif self.IsNotebookToc2():
+			e.args = (str(e) + ' in ".onetoc2" file',)
+		return
+
 	def ReadRootFileNodeList(self, header):
 		'''The root file node list is a file node list (section 2.4)
 		that specifies the set of all object spaces (section 2.1.4) contained in this file.
@@ -178,13 +280,17 @@ class OneStoreFile:
 		if self.IsNotebookSection():
 			allowed_nodes.add(ID.FileDataStoreListReferenceFND.value)
 
+		# The nodes are dumped to the log as they're read, in order of the root file node list.
+		# Otherwise, an object space is only loaded when first accessed.
+		load_now = getattr(self.verbose, 'dump_nodelists', False)
+
 		for node in FileNodeList(self, header.fcrFileNodeListRoot, allowed_nodes):
 			nid = node.ID
 			if nid == ID.ObjectSpaceManifestListReferenceFND:
-				from .object_space import ObjectSpace
-				object_space = ObjectSpace(self, node.ref)
-				assert(node.gosid == object_space.gosid)
-				self.ObjectSpaces[node.gosid] = object_space
+				self.ObjectSpaces[node.gosid] = None
+				self.ObjectSpaceRefs[node.gosid] = node.ref
+				if load_now:
+					self.LoadObjectSpace(node.gosid)
 			elif nid == ID.FileDataStoreListReferenceFND.value:
 				assert(self.FileDataStoreList is None)
 
@@ -193,7 +299,7 @@ class OneStoreFile:
 								{ID.FileDataStoreObjectReferenceFND}):
 					data_store_object = FileDataStoreObject(self, data_node.ref)
 					self.FileDataStoreList[data_node.guidReference] = data_store_object
-					node.data_store_object = data_store_object
+					data_node.data_store_object = data_store_object
 					continue
 			elif nid == ID.ObjectSpaceManifestRootFND:
 				assert(self.RootObjectSpaceId is None)
@@ -211,19 +317,47 @@ class OneStoreFile:
 	def IsNotebookToc2(self):
 		return self.file_format is self._one_toc2
 
+	def CheckNotClosed(self):
+		# Readers and views can't be made after the file data is released
+		if self.closed:
+			raise FileClosedException("File %s is already closed" % (self.filename,))
+		return
+
 	def get_chunk(self, chunk_ref:FileNodeChunkReference)->onestore_reader:
+		self.CheckNotClosed()
 		return onestore_reader(self.data, chunk_ref.cb, chunk_ref.stp)
 
 	def GetObjectSpaces(self):
 		return self.ObjectSpaces.keys()
 
 	def GetObjectSpace(self, osid:ExGUID):
-		return self.ObjectSpaces.get(osid, None)
+		self.CheckNotClosed()
+		object_space = self.ObjectSpaces.get(osid, None)
+		if object_space is None and osid in self.ObjectSpaceRefs:
+			try:
+				object_space = self.LoadObjectSpace(osid)
+			except UnexpectedFileNodeException as e:
+				self.AddFileTypeToException(e)
+				raise
+		return object_space
+
+	def LoadObjectSpace(self, osid:ExGUID):
+		from .object_space import ObjectSpace
+		object_space = ObjectSpace(self, self.ObjectSpaceRefs[osid])
+		assert(osid == object_space.gosid)
+		self.ObjectSpaces[osid] = object_space
+		del self.ObjectSpaceRefs[osid]
+		return object_space
 
 	def GetRootObjectSpaceId(self):
 		return self.RootObjectSpaceId
 
+	def GetDataStoreObject(self, guid)->FileDataStoreObject:
+		self.CheckNotClosed()
+		return self.FileDataStoreList.get(guid, None)
+
 	def GetDataStoreObjectData(self, guid):
+		self.CheckNotClosed()
 		return self.FileDataStoreList.get(guid, None).GetData()
 
 	def ReadOnefile(self, filename):
@@ -240,21 +374,79 @@ class OneStoreFile:
 	@staticmethod
 	def open(filename, options, log_file=None)->OneStoreFile:
 		with open(filename, 'rb') as fd:
-			return OneStoreFile(filename, fd.read(), options, log_file=log_file)
+			if not getattr(options, 'mmap', False):
+				if getattr(options, 'prefetch', False) and hasattr(os, 'posix_fadvise'):
+					# The whole file is read at once; let the OS read ahead
+					os.posix_fadvise(fd.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+				return OneStoreFile(filename, fd.read(), options, log_file=log_file)
+
+			if os.fstat(fd.fileno()).st_size == 0:
+				# An empty file cannot be mapped
+				return OneStoreFile(filename, b'', options, log_file=log_file)
+
+			import mmap
+			# The mapping stays valid after the file descriptor is closed.
+			# Only the pages actually touched by the parser are read from the file.
+			data = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+		try:
+			return OneStoreFile(filename, data, options, log_file=log_file)
+		except:
+			try:
+				data.close()
+			except BufferError:
+				# The objects referring to the mapped data are still kept by the exception traceback.
+				# The mapping is released when they're gone; report the original error
+				pass
+			raise
+
+	def close(self):
+		# Release the file mapping, if the file was open with 'mmap' option.
+		if self.closed:
+			return
+		self.closed = True
+		OneStoreFile.open_files -= 1
+		if OneStoreFile.open_files == 0:
+			ClearInternTables()
+		data = self.data.obj
+		self.data.release()
+		self.data = memoryview(b'')
+		# The loaded object spaces refer to the file data
+		self.ObjectSpaces = {}
+		self.ObjectSpaceRefs = {}
+		self.FileDataStoreList = None
+		if not hasattr(data, 'close'):
+			return
+
+		try:
+			data.close()
+		except BufferError:
+			# The parsed objects may be only kept alive by reference cycles
+			import gc
+			gc.collect()
+			try:
+				data.close()
+			except BufferError:
+				# Some of the parsed objects are still in use and refer to the mapped data.
+				# The mapping will only be released when they are gone
+				print("WARNING: File %s mapping is still in use, not released on close" % (self.filename,),
+					file=self.log_file if self.log_file is not None else sys.stderr)
+		return
 
 	def __enter__(self):
 		return self
 
 	def __exit__(self, exception_type, exception_value, exception_traceback):
+		self.close()
 		return False
 
 	def dump(self, fd, verbose=None):
 		self.header.dump(fd)
 		if getattr(verbose, 'dump_object_spaces', False):
 			print("\nRootObjectSpaceId=%s" % (self.RootObjectSpaceId,), file=fd)
-			for gosid, space in self.ObjectSpaces.items():
+			for gosid in self.GetObjectSpaces():
 				print("\nObjectSpaceID=%s" % (gosid,), file=fd)
-				space.dump(fd, verbose)
+				self.GetObjectSpace(gosid).dump(fd, verbose)
 		if getattr(verbose, 'dump_file_data_store', False) and self.FileDataStoreList is not None:
 			for extguid, file_data in self.FileDataStoreList.items():
 				print("File data object:", extguid, file=fd)
@@ -0,0 +1,124 @@
+#   Copyright 2024 Alexandre Grigoriev
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+# Prefetch planner for memory mapped files.
+# Parsing follows chunk references in logical order, which makes reads jump around the file.
+# On cold storage, it's faster to ask the OS to read the referred chunks ahead, in offset order.
+# The planner walks all file node lists level by level (a list is only known after its parent list is read),
+# asks to prefetch each level in offset order, and finally prefetches all object data chunks.
+# It only decodes file node headers and chunk references; the rest of each node is skipped by its size.
+
+import mmap
+from ..exception import OneException
+from ..base_types import FileChunkReference64x32, FileNodeChunkReference, FileNodeChunkReferenceDecoders
+from .filenode import FileNodeID
+from .filenode_list import FileNodeListHeader
+
+# Ranges closer than this are merged into a single prefetch request
+PREFETCH_MERGE_GAP = 0x10000
+
+ID_ChunkTerminatorFND = FileNodeID.ChunkTerminatorFND.value
+# Embedded file contents are only read when written out, don't prefetch them
+ID_FileDataStoreObjectReferenceFND = FileNodeID.FileDataStoreObjectReferenceFND.value
+
+class PrefetchPlanner:
+	def __init__(self, onestore):
+		self.onestore = onestore
+		self.data = onestore.data.obj
+		return
+
+	def CanPrefetch(self):
+		return isinstance(self.data, mmap.mmap) and hasattr(mmap, 'MADV_WILLNEED')
+
+	def Prefetch(self, ranges:list):
+		# ranges is a list of (offset, length) tuples
+		page_mask = mmap.PAGESIZE - 1
+		data_length = len(self.data)
+		start = end = None
+		for offset, length in sorted(ranges):
+			if start is not None and offset <= end + PREFETCH_MERGE_GAP:
+				end = max(end, offset + length)
+				continue
+			if start is not None:
+				self.data.madvise(mmap.MADV_WILLNEED, start, min(end, data_length) - start)
+			start = offset & ~page_mask
+			end = offset + length
+			continue
+		if start is not None:
+			self.data.madvise(mmap.MADV_WILLNEED, start, min(end, data_length) - start)
+		return
+
+	def ReadFragment(self, ref, next_level:list, data_ranges:list):
+		# Collects references from a single file node list fragment
+		reader = self.onestore.get_chunk(ref)
+		FileNodeListHeader(reader)
+		tail_reader = reader.extract(-20)
+		next_fragment = FileChunkReference64x32(tail_reader)
+		if not next_fragment.isNil():
+			next_level.append(next_fragment)
+
+		# Only the file node header and the chunk reference, which is the first field of a node
+		# with BaseType 1 or 2, are decoded. The rest of the node is skipped by its size
+		while reader.remaining() >= 4:
+			start_offset = reader.get_offset()
+			hdr = reader.read_uint32()
+			file_node_id = hdr & 0x3FF
+			if (hdr & 0x80000000) == 0 or file_node_id == ID_ChunkTerminatorFND:
+				break
+			Size = (hdr >> 10) & 0x1FFF
+			BaseType = (hdr >> 27) & 0xF
+			if BaseType == 1 or BaseType == 2:
+				ref_struct, decode_ref = FileNodeChunkReferenceDecoders[(hdr >> 23) & 0x3][(hdr >> 25) & 0x3]
+				stp, cb = decode_ref(*reader.read_struct(ref_struct))
+				if BaseType == 2:
+					next_level.append(FileNodeChunkReference(stp=stp, cb=cb))
+				elif file_node_id != ID_FileDataStoreObjectReferenceFND \
+					and not (stp == 0 and cb == 0) and not (stp == 0xFFFFFFFFFFFFFFFF and cb == 0):
+					data_ranges.append((stp, cb))
+
+			skip = start_offset + Size - reader.get_offset()
+			if skip < 0:
+				# Invalid node size; the parser will report it
+				break
+			reader.skip(skip)
+			continue
+		return
+
+	def Run(self, root_ref):
+		if not self.CanPrefetch():
+			return
+
+		level = [root_ref]
+		data_ranges = []
+		# A broken file may have a loop of references
+		visited = set()
+		while level:
+			self.Prefetch([(ref.stp, ref.cb) for ref in level])
+			next_level = []
+			for ref in sorted(level, key=lambda ref: ref.stp):
+				if ref.stp in visited:
+					continue
+				visited.add(ref.stp)
+				try:
+					self.ReadFragment(ref, next_level, data_ranges)
+				except (OneException, AssertionError):
+					# Best effort only; the parser will report the errors
+					pass
+				continue
+			level = [ref for ref in next_level if not ref.isNil() and not ref.isZero()]
+			continue
+
+		self.Prefetch(data_ranges)
+		return
@@ -25,10 +25,33 @@ class Property:
 		self.key_string = "Property_%X" % (self.property_id,)	# String to use as a key in the prop dictionary
 		self.data = data	# raw data
 		self.value = value	# usable value or array of values from raw data
-		self.str_value = str_value or str(value)	# value or array of values in string form
-		self.display_value = display_value or str_value	# Single string to display the value
+		# str_value: value or array of values in string form
+		# display_value: Single string to display the value
+		# If not given, these are only made on first access, see __getattr__
+		if str_value is not None:
+			self.str_value = str_value
+		if display_value or str_value:
+			self.display_value = display_value or str_value
 		return
 
+	def __getattr__(self, name):
+		# Only called when the attribute is not set yet.
+		# The string forms are mostly only needed for the log dump, don't make them until asked
+		if name == 'str_value':
+			value = self.make_str_value()
+		elif name == 'display_value':
+			value = self.make_display_value()
+		else:
+			raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+		setattr(self, name, value)
+		return value
+
+	def make_str_value(self):
+		return str(self.value)
+
+	def make_display_value(self):
+		return None
+
 	def read(self, reader, *args):
 		return self
 
@@ -63,59 +86,68 @@ class BoolProperty(Property):
 	def __init__(self, prop_id):
 		super().__init__(prop_id)
 		self.value = 0 != (prop_id & 0x80000000)
-		self.str_value = str(self.value)
-		self.display_value = self.str_value
 		return
 
+	def make_display_value(self):
+		return self.str_value
+
 class Property1To8bytesData(Property):
 	def read(self, reader, *args):
 		data_type = self.data_type
 
 		if data_type == PropertyTypeID.FourBytesOfData:
-			self.data = reader.read_bytes(4)
+			self.data = reader.read_view(4)
 		elif data_type == PropertyTypeID.OneByteOfData:
-			self.data = reader.read_bytes(1)
+			self.data = reader.read_view(1)
 		elif data_type == PropertyTypeID.TwoBytesOfData:
-			self.data = reader.read_bytes(2)
+			self.data = reader.read_view(2)
 		elif data_type == PropertyTypeID.EightBytesOfData:
-			self.data = reader.read_bytes(8)
+			self.data = reader.read_view(8)
 		self.value = int.from_bytes(self.data, byteorder="little", signed=False)
-		self.str_value = str(self.value)
-		self.display_value = self.str_value
 		return self
 
+	def make_display_value(self):
+		return self.str_value
+
 class FourBytesOfLengthFollowedByDataProperty(Property):
 	def read(self, reader, *args):
 		length = reader.read_uint32()
-		self.data = reader.read_bytes(length)
-		self.str_value = self.data.hex()
-		self.display_value = "%d bytes: %s" % (len(self.data), self.str_value)
+		# A view of the source data, not a copy
+		self.data = reader.read_view(length)
 		return self
 
-class ObjectIDProperty(Property):
+	def make_str_value(self):
+		return self.data.hex()
+
+	def make_display_value(self):
+		return "%d bytes: %s" % (len(self.data), self.str_value)
+
+class IDArrayProperty(Property):
+	# Base class for properties with an array of object IDs, object space IDs or context IDs
+	def make_str_value(self):
+		return [str(_id) for _id in self.value]
+
+class ObjectIDProperty(IDArrayProperty):
 	def read(self, reader, iterObjectIDs, iterObjectSpaceIDs, iterContextIDs):
 		# To simplify usage of single/array variants, we always put it in an array
 		coid, oid = next(iterObjectIDs)
 		self.data = [coid]
 		self.value = [oid]
-		self.str_value = [str(oid)]
 		return self
 
 	def dump(self, fd, verbose=None):
 		print("%s=OID: %s" % (self.get_property_name(verbose), self.str_value[0]), file=fd)
 		return
 
-class ArrayOfObjectIDsProperty(Property):
+class ArrayOfObjectIDsProperty(IDArrayProperty):
 	def read(self, reader, iterObjectIDs, iterObjectSpaceIDs, iterContextIDs):
 		count = reader.read_uint32()
 		self.data = []
 		self.value = []
-		self.str_value = []
 		for _ in range(count):
 			coid, oid = next(iterObjectIDs)
 			self.data.append(coid)
 			self.value.append(oid)
-			self.str_value.append(str(oid))
 		return self
 
 	def dump(self, fd, verbose=None):
@@ -124,30 +156,27 @@ class ArrayOfObjectIDsProperty(Property):
 			print("   ", oid_str, file=fd)
 		return
 
-class ObjectSpaceIDProperty(Property):
+class ObjectSpaceIDProperty(IDArrayProperty):
 	def read(self, reader, iterObjectIDs, iterObjectSpaceIDs, iterContextIDs):
 		# To simplify usage of single/array variants, we always put it in an array
 		coid, osid = next(iterObjectSpaceIDs)
 		self.data = [coid]
 		self.value = [osid]
-		self.str_value = [str(osid)]
 		return self
 
 	def dump(self, fd, verbose=None):
 		print("%s=OSID: %s" % (self.get_property_name(verbose), self.str_value[0]), file=fd)
 		return
 
-class ArrayOfObjectSpaceIDsProperty(Property):
+class ArrayOfObjectSpaceIDsProperty(IDArrayProperty):
 	def read(self, reader, iterObjectIDs, iterObjectSpaceIDs, iterContextIDs):
 		count = reader.read_uint32()
 		self.data = []
 		self.value = []
-		self.str_value = []
 		for _ in range(count):
 			coid, osid = next(iterObjectSpaceIDs)
 			self.data.append(coid)
 			self.value.append(osid)
-			self.str_value.append(str(osid))
 		return self
 
 	def dump(self, fd, verbose=None):
@@ -156,30 +185,27 @@ class ArrayOfObjectSpaceIDsProperty(Property):
 			print("   ", osid_str, file=fd)
 		return
 
-class ContextIDProperty(Property):
+class ContextIDProperty(IDArrayProperty):
 	def read(self, reader, iterObjectIDs, iterObjectSpaceIDs, iterContextIDs):
 		# To simplify usage of single/array variants, we always put it in an array
 		coid, ctxid = next(iterContextIDs)
 		self.data = [coid]
 		self.value = [ctxid]
-		self.str_value = [str(ctxid)]
 		return self
 
 	def dump(self, fd, verbose=None):
 		print("%s=CTXID: %s" % (self.get_property_name(verbose), self.str_value[0]), file=fd)
 		return
 
-class ArrayOfContextIDsProperty(Property):
+class ArrayOfContextIDsProperty(IDArrayProperty):
 	def read(self, reader, iterObjectIDs, iterObjectSpaceIDs, iterContextIDs):
 		count = reader.read_uint32()
 		self.data = []
 		self.value = []
-		self.str_value = []
 		for _ in range(count):
 			coid, ctxid = next(iterContextIDs)
 			self.data.append(coid)
 			self.value.append(ctxid)
-			self.str_value.append(str(ctxid))
 		return self
 
 	def dump(self, fd, verbose=None):
@@ -198,6 +224,10 @@ class PropertySetProperty(Property):
 		self.value = [property_set]
 		return self
 
+	def make_str_value(self):
+		# No string form; the property sets are dumped separately
+		return None
+
 	def dump(self, fd, verbose=None):
 		print("%s: PropertySet" % (self.get_property_name(verbose),), file=fd)
 		self.value[0].dump(fd, verbose)
@@ -220,6 +250,10 @@ class ArrayOfPropertyValuesProperty(Property):
 			self.value.append(property_set)
 		return self
 
+	def make_str_value(self):
+		# No string form; the property sets are dumped separately
+		return None
+
 	def dump(self, fd, verbose=None):
 		print("%s: ArrayOfPropertyValues" % (self.get_property_name(verbose),), file=fd)
 		for propset in self.value:
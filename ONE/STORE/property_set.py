@@ -14,7 +14,35 @@
 #
 
 from ..base_types import *
+from ..property_id import PropertyTypeID
 from .property import PropertyFactory
+from array import array
+from hashlib import md5
+import sys
+
+# Size of the property data in rgData, for property types with fixed size data
+PropertyFixedDataSize = {
+	int(PropertyTypeID.NoData) : 0, # 0x01
+	int(PropertyTypeID.Bool) : 0, # 0x02
+	int(PropertyTypeID.OneByteOfData) : 1, # 0x03
+	int(PropertyTypeID.TwoBytesOfData) : 2, # 0x04
+	int(PropertyTypeID.FourBytesOfData) : 4, # 0x05
+	int(PropertyTypeID.EightBytesOfData) : 8, # 0x06
+	}
+
+# Property types referring to object IDs, object space IDs and context IDs,
+# and index of the ID stream they consume
+PropertySingleIdStream = {
+	int(PropertyTypeID.ObjectID) : 0, # 0x08
+	int(PropertyTypeID.ObjectSpaceID) : 1, # 0x0A
+	int(PropertyTypeID.ContextID) : 2, # 0x0C
+	}
+
+PropertyArrayOfIdsStream = {
+	int(PropertyTypeID.ArrayOfObjectIDs) : 0, # 0x09
+	int(PropertyTypeID.ArrayOfObjectSpaceIDs) : 1, # 0x0B
+	int(PropertyTypeID.ArrayOfContextIDs) : 2, # 0x0D
+	}
 
 class PropertySet:
 	'''
@@ -29,26 +57,164 @@ class PropertySet:
 	'''
 
 	def __init__(self, jcid:JCID, raw_data:bytes=None):
-		self.properties = {}
 		self.jcid = jcid
 		self.oid = None
 		self.raw_data = raw_data  # for read-only objects only, to verify they're immutable
+		# The property set is kept in compact form: parallel arrays of property IDs,
+		# offsets of their data in rgData, and positions in the ID streams.
+		# Property objects are only made on demand.
+		self.prop_ids = array('I')
+		self.offsets = array('I')
+		self.stream_indices = array('I')
+		self.data_reader = None
+		self.data_length = 0
+		self.streams = (None, None, None)
+		# Range of IDs in each of the streams, used by this property set, including nested property sets
+		self.stream_ranges = ((0, 0), (0, 0), (0, 0))
+		# Nested property sets are read as Property objects right away
+		self.nested_properties = {}
+		self._properties = None
+		self._raw_digest = None
 		return
 
 	def read(self, reader, iterObjectIDs, iterObjectSpaceIDs, iterContextIDs):
+		# The ID iterators are ObjectSpaceObjectStreamCursor objects.
+		# Only the positions in their streams are recorded here, the IDs are resolved on demand.
 		cProperties = reader.read_uint16()
-		prop_ids_reader = reader.extract(4*cProperties)
-		for _ in range(cProperties):
-			prop_id = prop_ids_reader.read_uint32()
-			_property = PropertyFactory(prop_id)
-			_property.read(reader, iterObjectIDs, iterObjectSpaceIDs, iterContextIDs)
-			self.properties[_property.key] = _property
+		prop_ids = ReadUInt32Array(reader, cProperties)
+		self.prop_ids = prop_ids
+
+		cursors = (iterObjectIDs, iterObjectSpaceIDs, iterContextIDs)
+		self.streams = tuple(cursor.stream if cursor is not None else None for cursor in cursors)
+		# rgData offsets are relative to this reader
+		data_reader = reader.clone()
+		self.data_reader = data_reader
+		start_offset = reader.get_offset()
+		stream_starts = tuple(cursor.index if cursor is not None else 0 for cursor in cursors)
+
+		offsets = self.offsets
+		stream_indices = self.stream_indices
+		for i, prop_id in enumerate(prop_ids):
+			data_type = (prop_id & 0x7C000000) >> 26
+			offsets.append(reader.get_offset() - start_offset)
+			stream_index = 0
+
+			size = PropertyFixedDataSize.get(data_type, None)
+			if size is not None:
+				reader.skip(size)
+			elif data_type == PropertyTypeID.FourBytesOfLengthFollowedByData:
+				reader.skip(reader.read_uint32())
+			elif data_type in PropertySingleIdStream:
+				cursor = cursors[PropertySingleIdStream[data_type]]
+				stream_index = cursor.index
+				cursor.Skip(1)
+			elif data_type in PropertyArrayOfIdsStream:
+				cursor = cursors[PropertyArrayOfIdsStream[data_type]]
+				stream_index = cursor.index
+				cursor.Skip(reader.read_uint32())
+			else:
+				# Nested property sets, or an unrecognized type
+				_property = PropertyFactory(prop_id)
+				_property.read(reader, iterObjectIDs, iterObjectSpaceIDs, iterContextIDs)
+				self.nested_properties[i] = _property
+
+			stream_indices.append(stream_index)
 			continue
+
+		self.data_length = reader.get_offset() - start_offset
+		self.stream_ranges = tuple((start, cursor.index if cursor is not None else 0)
+								for start, cursor in zip(stream_starts, cursors))
 		return
 
+	def GetRawDigest(self)->bytes:
+		# Hash of the property set data, with object, object space and context IDs resolved to ExGUIDs,
+		# not including the objects it refers to. It doesn't depend on the revision.
+		digest = self._raw_digest
+		if digest is None:
+			md5hash = md5(usedforsecurity=False)
+			md5hash.update(self.jcid.jcid.to_bytes(4, byteorder='little', signed=False))
+			if self.data_reader is None:
+				# An encrypted property set is not decoded
+				if self.raw_data is not None:
+					md5hash.update(self.raw_data)
+			else:
+				md5hash.update(self.prop_ids.tobytes())
+				md5hash.update(self.data_reader.read_view_at(0, self.data_length))
+				for stream, (start, end) in zip(self.streams, self.stream_ranges):
+					if stream is None:
+						continue
+					for word in stream.words[start:end]:
+						_, exguid = stream.Resolve(word)
+						if exguid is None:
+							md5hash.update(b'\0')
+						else:
+							md5hash.update(exguid.guid)
+							md5hash.update(exguid.n.to_bytes(4, byteorder='little', signed=False))
+						continue
+					continue
+			digest = md5hash.digest()
+			self._raw_digest = digest
+		return digest
+
+	def GetObjectIDs(self):
+		# Returns IDs of the objects this property set (and its nested property sets) refers to,
+		# in order of the OIDs stream. A null reference is returned as None.
+		stream = self.streams[0]
+		if stream is None:
+			return ()
+		start, end = self.stream_ranges[0]
+		return [stream.Resolve(word)[1] for word in stream.words[start:end]]
+
+	def MakeProperty(self, i:int):
+		# Makes a Property object for the property at index i
+		_property = self.nested_properties.get(i, None)
+		if _property is not None:
+			return _property
+
+		prop_id = self.prop_ids[i]
+		_property = PropertyFactory(prop_id)
+		data_type = _property.data_type
+		cursors = [None, None, None]
+		stream = PropertySingleIdStream.get(data_type, None)
+		if stream is None:
+			stream = PropertyArrayOfIdsStream.get(data_type, None)
+		if stream is not None:
+			cursors[stream] = ObjectSpaceObjectStreamCursor(self.streams[stream], self.stream_indices[i])
+
+		_property.read(self.data_reader.clone(offset=self.offsets[i]), *cursors)
+		return _property
+
+	@property
+	def properties(self)->dict:
+		# All Property objects are only made when asked for
+		properties = self._properties
+		if properties is None:
+			properties = {}
+			for i in range(len(self.prop_ids)):
+				_property = self.MakeProperty(i)
+				properties[_property.key] = _property
+				continue
+			self._properties = properties
+		return properties
+
 	def Properties(self):
 		return self.properties.values()
 
+	def PropertyIDs(self):
+		return [prop_id & 0x7FFFFFFF for prop_id in self.prop_ids]
+
+	def GetProperty(self, property_id:int, default=None):
+		# Makes a single Property object, without making all others
+		if self._properties is not None:
+			return self._properties.get(property_id, default)
+		_property = default
+		# Same as in the dictionary, the last property with this ID wins
+		for i, prop_id in enumerate(self.prop_ids):
+			if (prop_id & 0x7FFFFFFF) == property_id:
+				_property = self.MakeProperty(i)
+			continue
+		return _property
+
 	def dump(self, fd, verbose=None):
 		if self.oid is not None:
 			print("OID: %s" % (self.oid,), file=fd)
@@ -89,7 +255,61 @@ class ObjectSpaceObjectStreamHeader:
 		self.OsidStreamNotPresent = 0 != (header & 0x80000000)
 		return
 
-class ObjectSpaceObjectStreamOfOIDs:
+def ReadUInt32Array(reader, count:int)->array:
+	# Read an array of 32 bit words (such as CompactID structures) in one operation
+	words = array('I')
+	assert(words.itemsize == 4)
+	words.frombytes(reader.read_view(4 * count))
+	if sys.byteorder != 'little':
+		words.byteswap()
+	return words
+
+class ObjectSpaceObjectStream:
+	'''
+	Common base for streams of CompactID structures.
+	The words are read in bulk, and resolved to extended GUIDs only when iterated over.
+	'''
+	def __init__(self, reader, global_id_table):
+		header = ObjectSpaceObjectStreamHeader(reader)
+		self.ExtendedStreamsPresent = header.ExtendedStreamsPresent
+		self.OsidStreamNotPresent = header.OsidStreamNotPresent
+
+		self.words = ReadUInt32Array(reader, header.Count)
+		self.global_id_table = global_id_table
+		return
+
+	def Resolve(self, word:int):
+		return CompactID(word=word), self.global_id_table.GetExGUID(word >> 8, word & 0xFF)
+
+	def __iter__(self):
+		return ObjectSpaceObjectStreamCursor(self)
+
+class ObjectSpaceObjectStreamCursor:
+	# Iterates over a stream of CompactIDs, keeping the current position in the stream
+	def __init__(self, stream:ObjectSpaceObjectStream, index:int=0):
+		self.stream = stream
+		self.index = index
+		return
+
+	def __iter__(self):
+		return self
+
+	def __next__(self):
+		index = self.index
+		words = self.stream.words
+		if index >= len(words):
+			raise StopIteration
+		self.index = index + 1
+		return self.stream.Resolve(words[index])
+
+	def Skip(self, count:int):
+		index = self.index + count
+		if index > len(self.stream.words):
+			raise StopIteration
+		self.index = index
+		return
+
+class ObjectSpaceObjectStreamOfOIDs(ObjectSpaceObjectStream):
 
 	def __init__(self, reader, global_id_table):
 		'''
@@ -104,24 +324,16 @@ class ObjectSpaceObjectStreamOfOIDs:
 		in the array specifies the identity of an object.
 		The number of elements is equal to the value of the header.Count field.
 		'''
-		header = ObjectSpaceObjectStreamHeader(reader)
-		self.ExtendedStreamsPresent = header.ExtendedStreamsPresent
-		self.OsidStreamNotPresent = header.OsidStreamNotPresent
-
-		self.ObjectIDs = []
-		for i in range(header.Count):
-			compact_id = CompactID(reader)
-			if compact_id.IsZero():
-				oid = None
-			else:
-				oid = global_id_table[compact_id]
-			self.ObjectIDs.append((compact_id, oid))
+		super().__init__(reader, global_id_table)
 		return
 
-	def __iter__(self):
-		return iter(self.ObjectIDs)
+	def Resolve(self, word:int):
+		if word == 0:
+			# Zero CompactID is a null reference
+			return CompactID(word=0), None
+		return super().Resolve(word)
 
-class ObjectSpaceObjectStreamOfOSIDs:
+class ObjectSpaceObjectStreamOfOSIDs(ObjectSpaceObjectStream):
 
 	def __init__(self, reader, global_id_table):
 		'''
@@ -136,21 +348,10 @@ class ObjectSpaceObjectStreamOfOSIDs:
 		in the array specifies the identity of an object.
 		The number of elements is equal to the value of the header.Count field.
 		'''
-		header = ObjectSpaceObjectStreamHeader(reader)
-		self.ExtendedStreamsPresent = header.ExtendedStreamsPresent
-		self.OsidStreamNotPresent = header.OsidStreamNotPresent
-
-		self.ObjectSpaceIDs = []
-		for i in range(header.Count):
-			compact_id = CompactID(reader)
-			osid = global_id_table[compact_id]
-			self.ObjectSpaceIDs.append((compact_id, osid))
+		super().__init__(reader, global_id_table)
 		return
 
-	def __iter__(self):
-		return iter(self.ObjectSpaceIDs)
-
-class ObjectSpaceObjectStreamOfContextIDs:
+class ObjectSpaceObjectStreamOfContextIDs(ObjectSpaceObjectStream):
 	'''
 	header (4 bytes): An ObjectSpaceObjectStreamHeader structure (section 2.6.5)
 	that specifies the number of elements in the body field and whether the
@@ -166,20 +367,9 @@ class ObjectSpaceObjectStreamOfContextIDs:
 
 	def __init__(self, reader, global_id_table):
 
-		header = ObjectSpaceObjectStreamHeader(reader)
-		self.ExtendedStreamsPresent = header.ExtendedStreamsPresent
-		self.OsidStreamNotPresent = header.OsidStreamNotPresent
-
-		self.ContextIDs = []
-		for i in range(header.Count):
-			compact_id = CompactID(reader)
-			ctxid = global_id_table[compact_id]
-			self.ContextIDs.append((compact_id, ctxid))
+		super().__init__(reader, global_id_table)
 		return
 
-	def __iter__(self):
-		return iter(self.ContextIDs)
-
 from .onestore import OneStoreFile
 def ObjectSpaceObjectPropSet(onestore:OneStoreFile, ref, jcid, global_id_table, encryption_key=None):
 	''' OIDs (variable): An ObjectSpaceObjectStreamOfOIDs (section 2.6.2)
@@ -220,3 +410,36 @@ def ObjectSpaceObjectPropSet(onestore:OneStoreFile, ref, jcid, global_id_table,
 	property_set.read(reader, iterObjectIDs, iterObjectSpaceIDs, iterContextIDs)
 
 	return property_set
+
+class LazyObjectSpaceObjectPropSet:
+	'''
+	Placeholder for a property set object, which is only read from the file on first access.
+	It keeps the chunk reference, JCID and the global ID table to decode the object with.
+	'''
+	def __init__(self, onestore:OneStoreFile, ref, jcid, global_id_table, encryption_key=None):
+		self.onestore = onestore
+		self.ref = ref
+		self.jcid = jcid
+		self.global_id_table = global_id_table
+		self.encryption_key = encryption_key
+		self.oid = None
+		self.property_set = None
+		if jcid.IsReadOnly() or encryption_key is not None:
+			# Read-only objects with same ID are verified to be identical
+			self.raw_data = onestore.get_chunk(ref).read_bytes_at(0, ref.cb)
+		else:
+			self.raw_data = None
+		return
+
+	def Load(self):
+		property_set = self.property_set
+		if property_set is None:
+			property_set = ObjectSpaceObjectPropSet(self.onestore, self.ref, self.jcid,
+										self.global_id_table, self.encryption_key)
+			property_set.oid = self.oid
+			self.property_set = property_set
+		return property_set
+
+	def dump(self, fd, verbose=None):
+		self.Load().dump(fd, verbose)
+		return
@@ -15,16 +15,26 @@
 
 from __future__ import annotations
 import sys
+import struct
 
 if sys.version_info < (3, 9):
 	sys.exit("onenote2xml: This package requires Python 3.9+")
 
 from ..exception import EndOfBufferException
 
+# Fixed width fields are decoded in place, at the absolute offset in the buffer
+_unpack_uint16 = struct.Struct('<H').unpack_from
+_unpack_uint32 = struct.Struct('<I').unpack_from
+_unpack_uint64 = struct.Struct('<Q').unpack_from
+
 class onestore_reader:
 	# If the length argument is supplied, it means the length after 'slice_offset' in the buffer
 	# If slice_offset is not specified, it's same as offset
-	def __init__(self, data:bytes, length:int=None, slice_offset:int=0):
+	# 'data' is a memoryview, or any object supporting the buffer protocol (bytes, mmap),
+	# which will then be wrapped into a memoryview. Readers cloned from this one share the same memoryview.
+	def __init__(self, data:memoryview|bytes, length:int=None, slice_offset:int=0):
+		if type(data) is not memoryview:
+			data = memoryview(data)
 		data_len = len(data)
 		if length is None:
 			length = data_len - slice_offset
@@ -71,9 +81,17 @@ class onestore_reader:
 			raise EndOfBufferException(
 				"Attempted slice of 0x%X bytes with only 0x%X bytes remaining in buffer"
 				% (length, self.length - offset))
-		return onestore_reader(self.data,
-								slice_offset=offset+self.slice_offset,
-								length=length)
+		return self._slice(offset + self.slice_offset, length)
+
+	def _slice(self, slice_offset:int, length:int):
+		# The bounds are already checked by the caller against this reader,
+		# don't check them again against the whole buffer
+		reader = object.__new__(type(self))
+		reader.data = self.data
+		reader.slice_offset = slice_offset
+		reader.offset = 0
+		reader.length = length
+		return reader
 
 	def extract(self, length:int=None):
 		if length is not None and length < 0:
@@ -87,7 +105,8 @@ class onestore_reader:
 			return reader
 
 		reader = self.clone(length=length)
-		self.skip(reader.length)
+		# clone() already checked the bounds
+		self.offset += reader.length
 		return reader
 
 	def check_read(self, length:int):
@@ -97,32 +116,67 @@ class onestore_reader:
 				% (length, self.length - self.offset))
 		return
 
+	# Reads a fixed layout structure, described by a precompiled struct.Struct (with '<' byte order).
+	# The whole record length is checked once; returns a tuple of all fields
+	def read_struct(self, record:struct.Struct)->tuple:
+		size = record.size
+		offset = self.offset
+		if offset + size > self.length:
+			raise EndOfBufferException(
+				"Attempted read of %d bytes with only %d bytes remaining in buffer"
+				% (size, self.length - offset))
+		self.offset = offset + size
+		return record.unpack_from(self.data, offset + self.slice_offset)
+
+	# Returns a copy of the data, for the caller to own
 	def read_bytes(self, length:int)->bytes:
+		return self.read_view(length).tobytes()
+
+	# Returns a memoryview of the source buffer, without copying the data.
+	# The view keeps the source buffer (which can be a file mapping) alive.
+	def read_view(self, length:int)->memoryview:
 		self.check_read(length)
 		offset = self.offset + self.slice_offset
-		bytes_read = self.data[offset:offset+length]
+		view = self.data[offset:offset+length]
 		self.offset += length
-		return bytes_read
+		return view
 
-	# Read without updating the current offset
+	# Read without updating the current offset. Returns a copy of the data, for the caller to own
 	def read_bytes_at(self, offset:int, length:int)->bytes:
+		return self.read_view_at(offset, length).tobytes()
+
+	# Read without updating the current offset. Returns a memoryview, without copying.
+	# The view keeps the source buffer alive; only use it for data not kept after the call
+	def read_view_at(self, offset:int, length:int)->memoryview:
 		self.check_read(length + offset)
 		offset += self.offset + self.slice_offset
-		bytes_read = self.data[offset:offset+length]
+		view = self.data[offset:offset+length]
 		# Not advancing self.offset
-		return bytes_read
+		return view
 
 	def read_uint8(self)->int:
-		return self.read_bytes(1)[0]
+		self.check_read(1)
+		value = self.data[self.offset + self.slice_offset]
+		self.offset += 1
+		return value
 
 	def read_uint16(self)->int:
-		return int.from_bytes(self.read_bytes(2), byteorder='little', signed=False)
+		self.check_read(2)
+		value, = _unpack_uint16(self.data, self.offset + self.slice_offset)
+		self.offset += 2
+		return value
 
 	def read_uint32(self)->int:
-		return int.from_bytes(self.read_bytes(4), byteorder='little', signed=False)
+		self.check_read(4)
+		value, = _unpack_uint32(self.data, self.offset + self.slice_offset)
+		self.offset += 4
+		return value
 
 	def read_uint64(self)->int:
-		return int.from_bytes(self.read_bytes(8), byteorder='little', signed=False)
+		self.check_read(8)
+		value, = _unpack_uint64(self.data, self.offset + self.slice_offset)
+		self.offset += 8
+		return value
 
 	def skip(self, skip_bytes:int):
 		self.check_read(skip_bytes)
@@ -16,12 +16,13 @@
 from ..base_types import *
 from ..exception import UnexpectedFileNodeException
 from ..exception import RevisionMismatchException
-from .property_set import ObjectSpaceObjectPropSet
+from .property_set import ObjectSpaceObjectPropSet, LazyObjectSpaceObjectPropSet
 from .filenode import FileNodeID as ID
 from .filenode import ObjectInfoDependencyOverrideData
 from .object_group import ObjectGroup
 from .global_id_table import GlobalIdTable
 from .filenode_list import FileNodeList
+from hashlib import md5
 
 ID_RevisionManifestListStartFND = ID.RevisionManifestListStartFND.value
 ID_RevisionRoleDeclarationFND = ID.RevisionRoleDeclarationFND.value
@@ -133,6 +134,30 @@ class ObjectDataEncryptionKey:
 		print("ObjectDataEncryptionKey:", self.key.hex(), file=fd)
 		return
 
+# Objects of the dependent revisions are looked up through a chain of their object tables.
+# When the chain grows longer than this, the tables are merged into a level dictionary,
+# to keep GetObjectById lookups bounded for long revision histories.
+MAX_OBJECT_CHAIN_DEPTH = 16
+
+def MergeObjectLevels(object_chain:list[dict], object_levels:tuple[dict])->tuple[dict]:
+	# The chain tables are merged into a new level. The levels are dictionaries shared by the revisions,
+	# never modified, most recent first. While the next older level is not bigger than the new one,
+	# it's merged into the new one, as well. This keeps the number of levels logarithmic
+	# to the number of objects, and each object is only copied a logarithmic number of times,
+	# instead of copying all objects for every MAX_OBJECT_CHAIN_DEPTH revisions.
+	merged = {}
+	for objects in reversed(object_chain):
+		merged.update(objects)
+		continue
+	levels = list(object_levels)
+	while levels and len(levels[0]) <= len(merged):
+		older = levels.pop(0).copy()
+		older.update(merged)
+		merged = older
+		continue
+	levels.insert(0, merged)
+	return tuple(levels)
+
 class RevisionManifest:
 	ROOT_ROLE_CONTENTS = 1
 	ROOT_ROLE_PAGE_METADATA = 2
@@ -145,6 +170,8 @@ class RevisionManifest:
 		self.encryption_key = None
 		self.object_groups = {}
 		self.root_objects = {}
+		# Merkle hashes of objects, calculated on demand
+		self.raw_hashes = {}
 
 		self.rid = node.rid
 		self.ridDependent = node.ridDependent
@@ -162,9 +189,21 @@ class RevisionManifest:
 			self.dep_revision = dep_revision
 			prev_global_id_table = dep_revision.global_id_table
 			self.root_objects = dep_revision.root_objects.copy()
+			# Object tables of dependent revisions, most recent first.
+			# The tables are complete by now, and not modified anymore
+			object_chain = [dep_revision.objects]
+			object_chain += dep_revision.object_chain
+			object_levels = dep_revision.object_levels
+			if len(object_chain) > MAX_OBJECT_CHAIN_DEPTH:
+				object_levels = MergeObjectLevels(object_chain, object_levels)
+				object_chain = []
+			self.object_chain = object_chain
+			self.object_levels = object_levels
 		else:
 			self.dep_revision = None
 			prev_global_id_table = None
+			self.object_chain = []
+			self.object_levels = ()
 
 		node = next(node_iter)
 		if node.ID.value == ID_ObjectDataEncryptionKeyV2FNDX:
@@ -198,6 +237,11 @@ class RevisionManifest:
 
 			node = next(node_iter)
 
+		if onestore.lazy:
+			MakePropSet = LazyObjectSpaceObjectPropSet
+		else:
+			MakePropSet = ObjectSpaceObjectPropSet
+
 		while (nid := node.ID) != ID_RevisionManifestEndFND:
 
 			if nid == ID_ObjectInfoDependencyOverridesFND:
@@ -212,15 +256,15 @@ class RevisionManifest:
 			elif nid == ID_ObjectDeclarationWithRefCountFNDX \
 			  or nid == ID_ObjectDeclarationWithRefCount2FNDX:
 				oid = self.global_id_table[node.body.coid]
-				obj = ObjectSpaceObjectPropSet(onestore, node.ObjectRef, node.body.jcid, self.global_id_table)
+				obj = MakePropSet(onestore, node.ObjectRef, node.body.jcid, self.global_id_table)
 				node.prop_set = obj
 				self.AddObject(oid, obj)
 			elif nid == ID_ObjectRevisionWithRefCountFNDX \
 			  or nid == ID_ObjectRevisionWithRefCount2FNDX:
 				oid = self.global_id_table[node.coid]
 				# Object's JCID is inherited from the existing definition
-				prev_object = self.GetObjectById(oid)
-				obj = ObjectSpaceObjectPropSet(onestore, node.ref, prev_object.jcid, self.global_id_table)
+				prev_object = self.FindObject(oid)
+				obj = MakePropSet(onestore, node.ref, prev_object.jcid, self.global_id_table)
 				node.prop_set = obj
 				self.AddObject(oid, obj)
 			elif nid == ID_RootObjectReference2FNDX:
@@ -253,7 +297,7 @@ class RevisionManifest:
 			return
 
 		# See if there is a previous object with same ID:
-		prev_obj = self.GetObjectById(oid)
+		prev_obj = self.FindObject(oid)
 		if prev_obj is not None:
 			# compare data
 			assert(prev_obj.jcid.IsReadOnly())
@@ -273,12 +317,56 @@ class RevisionManifest:
 		return
 
 	def GetObjectById(self, oid):
-		revision = self
-		while revision is not None:
-			obj = revision.objects.get(oid, None)
+		obj = self.FindObject(oid)
+		if type(obj) is LazyObjectSpaceObjectPropSet:
+			# Decode the property set on first access
+			obj = obj.Load()
+		return obj
+
+	def GetObjectRawHash(self, oid)->bytes:
+		'''
+		Returns a Merkle hash of the object: its ID, its raw data with resolved IDs,
+		and hashes of all objects it refers to, recursively.
+		Revisions with identical hashes of the root object have identical object trees.
+		'''
+		raw_hash = self.raw_hashes.get(oid, None)
+		if raw_hash is not None:
+			return raw_hash
+
+		# An unexpected circular reference gets an empty hash
+		self.raw_hashes[oid] = b''
+		md5hash = md5(usedforsecurity=False)
+		md5hash.update(oid.guid)
+		md5hash.update(oid.n.to_bytes(4, byteorder='little', signed=False))
+
+		prop_set = self.GetObjectById(oid)
+		if prop_set is not None:
+			md5hash.update(prop_set.GetRawDigest())
+			for child_oid in prop_set.GetObjectIDs():
+				if child_oid is None:
+					md5hash.update(b'\0')
+				else:
+					md5hash.update(self.GetObjectRawHash(child_oid))
+				continue
+
+		raw_hash = md5hash.digest()
+		self.raw_hashes[oid] = raw_hash
+		return raw_hash
+
+	def FindObject(self, oid):
+		# Returns the object as stored, without decoding a lazy property set
+		obj = self.objects.get(oid, None)
+		if obj is not None:
+			return obj
+		for objects in self.object_chain:
+			obj = objects.get(oid, None)
+			if obj is not None:
+				return obj
+			continue
+		for objects in self.object_levels:
+			obj = objects.get(oid, None)
 			if obj is not None:
 				return obj
-			revision = revision.dep_revision
 			continue
 		return None
 
@@ -15,6 +15,7 @@
 
 from __future__ import annotations
 import locale
+import struct
 import sys
 
 from .exception import ArgumentException
@@ -31,8 +32,9 @@ AND NOT EXPLICITLY EXPLAIN THAT CLUSTERFUCK ANYWHERE!!
 '''
 
 class CompactID:
+	__slots__ = ('n', 'guidIndex')
 
-	def __init__(self, reader:onestore_reader):
+	def __init__(self, reader:onestore_reader=None, word:int=0):
 		'''
 		The CompactID structure is a combination of two unsigned integers.
 		A CompactID structure together with a global identification table (section 2.1.3)
@@ -42,7 +44,9 @@ class CompactID:
 		guidIndex (24 bits): An unsigned integer that specifies the index in the global identification table.
 		The GUID that corresponds to this index provides the value for the ExtendedGUID.guid field.
 		'''
-		word = reader.read_uint32()
+		# The word can also be given directly, if already read as a part of a bigger structure
+		if reader is not None:
+			word = reader.read_uint32()
 		self.n = word & 0xFF
 		self.guidIndex = word >> 8
 		return
@@ -109,7 +113,7 @@ def StringInStorageBuffer(reader:onestore_reader):
 	'''
 
 	length = reader.read_uint32()
-	return Utf16BytesToStr(reader.read_bytes(length*2))
+	return Utf16BytesToStr(reader.read_view(length*2))
 
 import datetime
 GregorianEpoch = datetime.datetime(1601, 1, 1, 0, 0, 0, tzinfo=datetime.timezone.utc)
@@ -139,47 +143,21 @@ def Time32ToUnixTimestamp(time32:int):
 	return int(date.timestamp())
 
 class FileNodeChunkReference:
+	__slots__ = ('stp', 'cb')
 	'''
 	'''
 
-	def __init__(self, reader:onestore_reader, StpFormat, CbFormat):
-		if StpFormat == 0:
-			self.stp = reader.read_uint64()
-		elif StpFormat == 1:
-			self.stp = reader.read_uint32()
-		elif StpFormat == 2:
-			self.stp = reader.read_uint16() * 8
-		elif StpFormat == 3:
-			self.stp = reader.read_uint32() * 8
-		else:
-			raise ArgumentException("Invalid chunk position format %d" % (StpFormat,))
-
-		if CbFormat == 0:
-			self.cb = reader.read_uint32()
-		elif CbFormat == 1:
-			self.cb = reader.read_uint64()
-		elif CbFormat == 2:
-			self.cb = reader.read_uint8() * 8
-		elif CbFormat == 3:
-			self.cb = reader.read_uint16() * 8
-		else:
-			raise ArgumentException("Invalid chunk size format %d" % (CbFormat,))
-
-		if self.cb != 0:
-			return
-
-		# Convert to 64 bit Nil from smaller formats
-		if StpFormat == 1:
-			if self.stp == 0xFFFFFFFF:
-				self.stp = 0xFFFFFFFFFFFFFFFF
-		elif StpFormat == 2:
-			if self.stp == 0xFFFF*8:
-				# Convert to 64 bit Nil
-				self.stp = 0xFFFFFFFFFFFFFFFF
-		elif StpFormat == 3:
-			if self.stp == 0xFFFFFFFF*8:
-				# Convert to 64 bit Nil
-				self.stp = 0xFFFFFFFFFFFFFFFF
+	def __init__(self, reader:onestore_reader=None, StpFormat=0, CbFormat=0, stp:int=0, cb:int=0):
+		# The reference can also be constructed from already decoded 'stp' and 'cb' values
+		if reader is not None:
+			if StpFormat > 3:
+				raise ArgumentException("Invalid chunk position format %d" % (StpFormat,))
+			if CbFormat > 3:
+				raise ArgumentException("Invalid chunk size format %d" % (CbFormat,))
+			ref_struct, decode = FileNodeChunkReferenceDecoders[StpFormat][CbFormat]
+			stp, cb = decode(*reader.read_struct(ref_struct))
+		self.stp = stp
+		self.cb = cb
 		return
 
 	def isZero(self):
@@ -191,32 +169,76 @@ class FileNodeChunkReference:
 	def __str__(self):
 		return "%X:%X" % (self.stp, self.cb)
 
+# The following references can also be constructed from 'stp' and 'cb' values,
+# if already read as a part of a bigger structure
+
 class FileChunkReference32(FileNodeChunkReference):
+	__slots__ = ()
+	STRUCT = struct.Struct('<II')
 
-	def __init__(self, reader:onestore_reader):
-		self.stp = reader.read_uint32()
-		self.cb = reader.read_uint32()
+	def __init__(self, reader:onestore_reader=None, stp:int=0, cb:int=0):
+		if reader is not None:
+			stp, cb = reader.read_struct(self.STRUCT)
 
 		# Convert to 64 bit Nil from 32 bit
-		if self.cb == 0 and self.stp == 0xFFFFFFFF:
-			self.stp = 0xFFFFFFFFFFFFFFFF
+		if cb == 0 and stp == 0xFFFFFFFF:
+			stp = 0xFFFFFFFFFFFFFFFF
+		self.stp = stp
+		self.cb = cb
 		return
 
 class FileChunkReference64x32(FileNodeChunkReference):
-
-	def __init__(self, reader:onestore_reader):
-		self.stp = reader.read_uint64()
-		self.cb = reader.read_uint32()
+	__slots__ = ()
+	STRUCT = struct.Struct('<QI')
+
+	def __init__(self, reader:onestore_reader=None, stp:int=0, cb:int=0):
+		if reader is not None:
+			stp, cb = reader.read_struct(self.STRUCT)
+		self.stp = stp
+		self.cb = cb
 		return
 
 class FileChunkReference64(FileNodeChunkReference):
-
-	def __init__(self, reader:onestore_reader):
-		self.stp = reader.read_uint64()
-		self.cb = reader.read_uint64()
+	__slots__ = ()
+	STRUCT = struct.Struct('<QQ')
+
+	def __init__(self, reader:onestore_reader=None, stp:int=0, cb:int=0):
+		if reader is not None:
+			stp, cb = reader.read_struct(self.STRUCT)
+		self.stp = stp
+		self.cb = cb
 		return
 
+def MakeFileNodeChunkReferenceDecoder(StpFormat, CbFormat):
+	'''
+	Returns a tuple of 'struct' format of a compressed FileNodeChunkReference with the given formats,
+	and a function to convert the unpacked raw (stp, cb) values to the actual position and size.
+	'''
+	stp_format, stp_scale, stp_nil = (
+		('Q', 1, None),
+		('I', 1, 0xFFFFFFFF),
+		('H', 8, 0xFFFF),
+		('I', 8, 0xFFFFFFFF),
+		)[StpFormat]
+	cb_format, cb_scale = (('I', 1), ('Q', 1), ('B', 8), ('H', 8))[CbFormat]
+
+	def decode(stp:int, cb:int):
+		# Convert to 64 bit Nil from smaller formats
+		if cb == 0 and stp == stp_nil:
+			return 0xFFFFFFFFFFFFFFFF, 0
+		return stp * stp_scale, cb * cb_scale
+
+	return stp_format + cb_format, decode
+
+# Indexed by [StpFormat][CbFormat]. The format is returned as compiled struct.Struct
+FileNodeChunkReferenceDecoders = tuple(
+	tuple((struct.Struct('<' + ref_format), decode)
+		for ref_format, decode in (MakeFileNodeChunkReferenceDecoder(StpFormat, CbFormat)
+			for CbFormat in range(4)))
+	for StpFormat in range(4))
+
 class JCID:
+	__slots__ = ('jcid',)
 	def __init__(self, jcid:int=0):
 		self.jcid = jcid
 		return
@@ -243,32 +265,71 @@ class JCID:
 	def IsReadOnly(self):
 		return (self.jcid & 0x100000) != 0
 
+# Cache of GUID strings already parsed, to their binary form.
+# It's dropped when it grows to the limit, so that it's bounded even if arbitrary strings are parsed
+GUIDStringCache:dict[str,bytes] = {}
+GUID_STRING_CACHE_LIMIT = 4096
+
+def ParseGUIDString(guid_str:str)->bytes:
+	guid = GUIDStringCache.get(guid_str, None)
+	if guid is not None:
+		return guid
+
+	# Only accept the strict "{XXXXXXXX-XXXX-XXXX-XXXX-XXXXXXXXXXXX}" form
+	if len(guid_str) != 38 \
+		or guid_str[0] != '{' or guid_str[37] != '}' \
+		or guid_str[9] != '-' or guid_str[14] != '-' \
+		or guid_str[19] != '-' or guid_str[24] != '-':
+		raise ArgumentException("Invalid GUID:" + guid_str)
+
+	hex_digits = guid_str[1:9] + guid_str[10:14] + guid_str[15:19] + guid_str[20:24] + guid_str[25:37]
+	try:
+		data = bytes.fromhex(hex_digits)
+	except ValueError:
+		data = b''
+	# bytes.fromhex skips whitespace, which makes the result shorter
+	if len(data) != 16:
+		raise ArgumentException("Invalid GUID:" + guid_str)
+
+	# First three fields are stored little endian
+	guid = data[3::-1] + data[5:3:-1] + data[7:5:-1] + data[8:]
+	if len(GUIDStringCache) >= GUID_STRING_CACHE_LIMIT:
+		GUIDStringCache.clear()
+	GUIDStringCache[guid_str] = guid
+	return guid
+
+def FormatGUIDBytes(guid:bytes)->str:
+	# First three fields are stored little endian
+	h = (guid[3::-1] + guid[5:3:-1] + guid[7:5:-1] + guid[8:]).hex().upper()
+	return '{' + h[0:8] + '-' + h[8:12] + '-' + h[12:16] + '-' + h[16:20] + '-' + h[20:32] + '}'
+
 class GUID:
+	__slots__ = ('guid', '_str')
 	def __init__(self, guid:bytes|str=None):
 		if type(guid) is str:
-			import re
-			m = re.fullmatch(r'\{([0-9a-fA-F]{8})-([0-9a-fA-F]{4})-([0-9a-fA-F]{4})-([0-9a-fA-F]{4})-([0-9a-fA-F]{12})\}', guid)
-			if not m:
-				raise ArgumentException("Invalid GUID:" + guid)
-			guid = bytes(reversed(bytes.fromhex(m[3]) + bytes.fromhex(m[2]) + bytes.fromhex(m[1])))
-			guid += bytes.fromhex(m[4]) + bytes.fromhex(m[5])
+			guid = ParseGUIDString(guid)
 		elif guid is not None:
+			if type(guid) is memoryview:
+				# A GUID needs to own its bytes, to be used as a dictionary key
+				guid = guid.tobytes()
 			assert(type(guid) is bytes)
 			assert(len(guid) == 16)
 		self.guid:bytes = guid
+		# The string form is made on first use, and kept with the (usually interned) instance
+		self._str:str = None
 		return
 
 	def read(self, reader:onestore_reader):
 		self.guid:bytes = reader.read_bytes(16)
+		self._str = None
 		return self
 
 	def __str__(self):
-		return "{%02X%02X%02X%02X-%02X%02X-%02X%02X-%02X%02X-%02X%02X%02X%02X%02X%02X}" % (
-			self.guid[3], self.guid[2], self.guid[1], self.guid[0],
-			self.guid[5], self.guid[4], self.guid[7], self.guid[6],
-			self.guid[8], self.guid[9], self.guid[10], self.guid[11],
-			self.guid[12], self.guid[13], self.guid[14], self.guid[15],
-			)
+		s = self._str
+		if s is None:
+			s = FormatGUIDBytes(self.guid)
+			self._str = s
+		return s
 	# Define methods to allow use as a dictionary key
 	def __hash__(self) -> int:
 		return self.guid.__hash__()
@@ -277,7 +338,8 @@ class GUID:
 		return self.__str__()
 
 	def __eq__(self, value: object) -> bool:
-		return self.guid == value.guid
+		# Interned instances compare by identity first
+		return self is value or self.guid == value.guid
 
 	def _xor_guid(self, other):
 		return bytes(self.guid[i] ^ other.guid[i] for i in range(16))
@@ -286,6 +348,7 @@ class GUID:
 		return GUID(self._xor_guid(other))
 
 class ExGUID(GUID):
+	__slots__ = ('n',)
 	def __init__(self, guid:bytes=None, n:int=None):
 		super().__init__(guid)
 		self.n:int = n
@@ -297,20 +360,59 @@ class ExGUID(GUID):
 		return self
 
 	def __str__(self):
-		return "{%s,%d}" % (super().__str__(), self.n)
+		s = self._str
+		if s is None:
+			s = "{%s,%d}" % (FormatGUIDBytes(self.guid), self.n)
+			self._str = s
+		return s
 
 	# Define methods to allow use as a dictionary key
 	def __hash__(self) -> int:
 		return self.guid.__hash__() ^ self.n.__hash__()
 
 	def __eq__(self, value: object) -> bool:
-		return self.guid == value.guid and self.n == value.n
+		return self is value or (self.guid == value.guid and self.n == value.n)
 
 	def __xor__(self, other):
 		return ExGUID(self._xor_guid(other), self.n ^ other.n)
 
-NULL_GUID = GUID(b'\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0')
-NULL_ExGUID = ExGUID(b'\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0', 0)
+# Intern tables return one canonical instance per GUID bytes and (GUID bytes, n) pair.
+# The same IDs are repeated many times over all revisions of a file;
+# sharing the instances saves memory and lets dictionary lookups
+# succeed on identity check, without comparing the bytes.
+GUIDInternTable:dict[bytes,GUID] = {}
+ExGUIDInternTable:dict[tuple[bytes,int],ExGUID] = {}
+
+def InternGUID(guid:bytes)->GUID:
+	interned = GUIDInternTable.get(guid, None)
+	if interned is None:
+		interned = GUID(guid)
+		GUIDInternTable[interned.guid] = interned
+	return interned
+
+def InternExGUID(guid:bytes, n:int)->ExGUID:
+	key = (guid, n)
+	interned = ExGUIDInternTable.get(key, None)
+	if interned is None:
+		# Share the bytes object with the interned GUID
+		guid = InternGUID(guid).guid
+		interned = ExGUID(guid, n)
+		ExGUIDInternTable[(guid, n)] = interned
+	return interned
+
+def ClearInternTables():
+	# Interned instances still referenced keep working, because the equality
+	# falls back to comparing the bytes
+	GUIDInternTable.clear()
+	ExGUIDInternTable.clear()
+	GUIDStringCache.clear()
+	# Null IDs stay canonical, they're compared against by the parser
+	GUIDInternTable[NULL_GUID.guid] = NULL_GUID
+	ExGUIDInternTable[(NULL_ExGUID.guid, NULL_ExGUID.n)] = NULL_ExGUID
+	return
+
+NULL_GUID = InternGUID(b'\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0')
+NULL_ExGUID = InternExGUID(b'\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0', 0)
 
 def UnpackFloat32(data:bytes):
 	assert(len(data) == 4)
@@ -25,3 +25,4 @@ class RevisionMismatchException(OneException): ...
 class UnrecognizedPropertyDataTypeException(OneException): ...
 class CircularObjectReferenceException(OneException): ...
 class ObjectNotFoundException(OneException): ...
+class FileClosedException(OneException): ...
@@ -26,6 +26,12 @@ def main():
 	parser = argparse.ArgumentParser(description='Parse Microsoft OneNote files.', allow_abbrev=False)
 	parser.add_argument("onefile", metavar='<onefile>', help="Source '.one' or '.onetoc2' Microsoft OneNote file")
 	parser.add_argument("--log", '-L', metavar='<log file>', help="Log file")
+	parser.add_argument("--mmap", '-m', action="store_true",
+						help="Map the source file to memory, instead of reading it whole")
+	parser.add_argument("--prefetch", '-P', action="store_true",
+						help="Ask the OS to read ahead the file structures in offset order, before parsing")
+	parser.add_argument("--lazy", '-z', action="store_true",
+						help="Decode objects on first access, instead of all objects when the file is opened")
 	parser.add_argument("--raw", '-w', action="store_true",
 						help="Load as a raw MS-ONESTORE file, do not decode MS-ONE file structure")
 	parser.add_argument("--list-revisions", '-l', action="store_true",
@@ -64,6 +70,7 @@ def main():
 		onefile.dump(log_file, options.verbose)
 		log_file.close()
 
+	onefile.close()
 	return 0
 
 if __name__ == "__main__":
@@ -0,0 +1,387 @@
+#   Copyright 2024 Alexandre Grigoriev
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+# Writer of small synthetic ".one" section files for the tests.
+# A file has a section object space, and one object space per page. Each page has a number of revisions;
+# every other revision depends on the previous one, and only redeclares some of its objects.
+# The pages contain an outline with a rich text paragraph, read-only style and author objects,
+# an embedded file, and a title node which refers to a node changed in every revision
+# by an undocumented property. The file is only meant to exercise the parser, it's not opened by OneNote.
+
+import struct
+import random
+from uuid import UUID
+
+from ONE.property_id import PropertyID as PID
+from ONE.property_set_jcid import PropertySetJCID as JCID
+from ONE.STORE.filenode import FileNodeID as ID
+
+# Undocumented properties, to check the generic data types
+PID_UndocumentedBlob = 0x1C00F00D
+PID_UndocumentedBool = 0x8800F00E
+PID_UndocumentedArrayOfPropertyValues = 0x4000F010
+PID_UndocumentedPropertyValue = 0x4400F011
+PID_UndocumentedObjectID = 0x2000F012
+
+# 1970-01-01 as FILETIME
+FILETIME_1970 = 116444736000000000
+
+FILE_NODE_LIST_HEADER_MAGIC = 0xA4567AB1F5F7F4C4
+FILE_NODE_LIST_FOOTER_MAGIC = 0x8BC215C38233BA4B
+FILE_DATA_STORE_OBJECT_HEADER = UUID('{BDE316E7-2665-4511-A4C4-8D4D0B7A9EAC}').bytes_le
+FILE_DATA_STORE_OBJECT_FOOTER = UUID('{71FBA722-0F79-4A0B-BB13-899256426B24}').bytes_le
+ONE_SECTION_FILE_TYPE = UUID('{7B5C52E4-D88C-4DA7-AEB1-5378D02996D3}').bytes_le
+ONE_FILE_FORMAT = UUID('{109ADD3F-911B-49F5-A5D0-1791EDC8AED8}').bytes_le
+REVISION_HISTORY_CONTEXT = UUID('{7111497F-1B6B-4209-9491-C98B04CF4C5A}').bytes_le
+NULL_GUID = b'\0' * 16
+
+def ExGUID(guid:bytes, n:int)->bytes:
+	return guid + struct.pack('<I', n)
+
+def CompactID(index:int, n:int)->int:
+	return (index << 8) | n
+
+def Utf16(s:str)->bytes:
+	return s.encode('utf-16-le')
+
+def Prefixed(data:bytes)->bytes:
+	# Data prefixed with its length
+	return struct.pack('<I', len(data)) + data
+
+def PropertyBody(properties)->bytes:
+	# properties: list of (property ID, data) tuples
+	body = struct.pack('<H', len(properties))
+	body += b''.join(struct.pack('<I', prop_id) for prop_id, _ in properties)
+	body += b''.join(data for _, data in properties)
+	return body
+
+def PropertySet(properties, oids=(), osids=None, context_ids=None)->bytes:
+	def Stream(ids, osid_stream_not_present, extended_streams_present):
+		header = len(ids)
+		if extended_streams_present:
+			header |= 0x40000000
+		if osid_stream_not_present:
+			header |= 0x80000000
+		return struct.pack('<I', header) + b''.join(struct.pack('<I', compact_id) for compact_id in ids)
+
+	osid_stream_not_present = osids is None and context_ids is None
+	data = Stream(oids, osid_stream_not_present, False)
+	if not osid_stream_not_present:
+		data += Stream(osids or (), False, context_ids is not None)
+		if context_ids is not None:
+			data += Stream(context_ids, False, False)
+	return data + PropertyBody(properties)
+
+class SampleFileWriter:
+	def __init__(self, seed:int):
+		# The header is filled last
+		self.buf = bytearray(1024)
+		self.random = random.Random(seed)
+		self.list_id = 0x10
+		return
+
+	def NewGUID(self)->bytes:
+		return bytes(self.random.getrandbits(8) for _ in range(16))
+
+	def Alloc(self, data:bytes):
+		# Chunks are aligned to 8 bytes
+		while len(self.buf) % 8:
+			self.buf.append(0)
+		stp = len(self.buf)
+		self.buf += data
+		return stp, len(data)
+
+	def ChunkReference(self, stp:int, cb:int):
+		# All formats which can encode the reference are used at random
+		formats = []
+		for stp_format in range(4):
+			if stp_format == 1 and stp > 0xFFFFFFFF:
+				continue
+			if stp_format == 2 and (stp % 8 or stp // 8 > 0xFFFF):
+				continue
+			if stp_format == 3 and (stp % 8 or stp // 8 > 0xFFFFFFFF):
+				continue
+			for cb_format in range(4):
+				if cb_format == 0 and cb > 0xFFFFFFFF:
+					continue
+				if cb_format == 2 and (cb % 8 or cb // 8 > 0xFF):
+					continue
+				if cb_format == 3 and (cb % 8 or cb // 8 > 0xFFFF):
+					continue
+				formats.append((stp_format, cb_format))
+				continue
+			continue
+		stp_format, cb_format = self.random.choice(formats)
+		data = struct.pack(('<Q', '<I', '<H', '<I')[stp_format], stp // 8 if stp_format >= 2 else stp)
+		data += struct.pack(('<I', '<Q', '<B', '<H')[cb_format], cb // 8 if cb_format >= 2 else cb)
+		return stp_format, cb_format, data
+
+	def FileNode(self, node_id:int, body:bytes=b'', base_type:int=0, ref=None)->bytes:
+		stp_format = cb_format = 0
+		if ref is not None:
+			stp_format, cb_format, ref_data = self.ChunkReference(*ref)
+			body = ref_data + body
+		size = 4 + len(body)
+		header = node_id | (size << 10) | (stp_format << 23) | (cb_format << 25) | (base_type << 27) | 0x80000000
+		return struct.pack('<I', header) + body
+
+	def FileNodeList(self, nodes, nodes_per_fragment:int=3):
+		# The list is split to fragments. Later fragments are written first, to know the next fragment references
+		self.list_id += 1
+		list_id = self.list_id
+		fragments = [nodes[i:i + nodes_per_fragment] for i in range(0, len(nodes), nodes_per_fragment)] or [[]]
+		next_ref = (0xFFFFFFFFFFFFFFFF, 0)
+		for i in reversed(range(len(fragments))):
+			body = b''.join(fragments[i])
+			if i != len(fragments) - 1:
+				body += self.FileNode(ID.ChunkTerminatorFND)
+			data = struct.pack('<QII', FILE_NODE_LIST_HEADER_MAGIC, list_id, i) + body + b'\0' * 5 \
+				+ struct.pack('<QI', *next_ref) + struct.pack('<Q', FILE_NODE_LIST_FOOTER_MAGIC)
+			next_ref = self.Alloc(data)
+			continue
+		return next_ref
+
+	def ObjectGroup(self, group_id:bytes, guids, objects):
+		# guids: GUIDs of the global ID table, by index; objects: list of (compact ID, JCID, data, read only),
+		# or (None, compact ID, JCID, file data reference, extension) for file data objects
+		nodes = [self.FileNode(ID.ObjectGroupStartFND, ExGUID(group_id, 1)), self.FileNode(ID.GlobalIdTableStart2FND)]
+		for index, guid in enumerate(guids):
+			nodes.append(self.FileNode(ID.GlobalIdTableEntryFNDX, struct.pack('<I', index) + guid))
+			continue
+		nodes.append(self.FileNode(ID.GlobalIdTableEndFNDX))
+		for obj in objects:
+			if obj[0] is None:
+				_, compact_id, jcid, reference, extension = obj
+				body = struct.pack('<IIB', compact_id, jcid, 1) \
+					+ struct.pack('<I', len(reference)) + Utf16(reference) \
+					+ struct.pack('<I', len(extension)) + Utf16(extension)
+				nodes.append(self.FileNode(ID.ObjectDeclarationFileData3RefCountFND, body))
+				continue
+			compact_id, jcid, data, read_only = obj
+			ref = self.Alloc(data)
+			if read_only:
+				nodes.append(self.FileNode(ID.ReadOnlyObjectDeclaration2RefCountFND,
+					struct.pack('<IIBB', compact_id, jcid, 0, 1) + b'\x11' * 16, base_type=1, ref=ref))
+			else:
+				nodes.append(self.FileNode(ID.ObjectDeclaration2RefCountFND,
+					struct.pack('<IIBB', compact_id, jcid, 0, 1), base_type=1, ref=ref))
+			continue
+		nodes.append(self.FileNode(ID.ObjectGroupEndFND))
+		return self.FileNodeList(nodes, nodes_per_fragment=4)
+
+	def RevisionManifestList(self, gosid:bytes, revisions):
+		# revisions: list of dictionaries {rid, dep, groups: [(group ID, list reference)], roots: [(role, ExGUID)], context}
+		nodes = [self.FileNode(ID.RevisionManifestListStartFND, ExGUID(gosid, 1) + struct.pack('<I', 0))]
+		for revision in revisions:
+			dependent = ExGUID(revision['dep'], 1) if revision['dep'] is not None else ExGUID(NULL_GUID, 0)
+			nodes.append(self.FileNode(ID.RevisionManifestStart6FND,
+				ExGUID(revision['rid'], 1) + dependent + struct.pack('<IH', 1, 0)))
+			for group_id, group_ref in revision['groups']:
+				nodes.append(self.FileNode(ID.ObjectGroupListReferenceFND, ExGUID(group_id, 1), base_type=2, ref=group_ref))
+				continue
+			nodes.append(self.FileNode(ID.GlobalIdTableStart2FND))
+			nodes.append(self.FileNode(ID.GlobalIdTableEndFNDX))
+			for role, oid in revision['roots']:
+				nodes.append(self.FileNode(ID.RootObjectReference3FND, oid + struct.pack('<I', role)))
+				continue
+			nodes.append(self.FileNode(ID.RevisionManifestEndFND))
+			if revision['context'] is not None:
+				nodes.append(self.FileNode(ID.RevisionRoleAndContextDeclarationFND,
+					ExGUID(revision['rid'], 1) + struct.pack('<I', 1) + revision['context']))
+			continue
+		return self.FileNodeList(nodes, nodes_per_fragment=5)
+
+	def ObjectSpace(self, gosid:bytes, revisions):
+		rev_list_ref = self.RevisionManifestList(gosid, revisions)
+		return self.FileNodeList([self.FileNode(ID.ObjectSpaceManifestListStartFND, ExGUID(gosid, 1)),
+			self.FileNode(ID.RevisionManifestListReferenceFND, base_type=2, ref=rev_list_ref)])
+
+	def Page(self, page_index:int, revisions:int, file_data_guid:bytes, same_page_width:bool, all_dependent:bool=False):
+		# Returns the page object space ID and its file node list reference
+		gosid = self.NewGUID()
+		page_guid = self.NewGUID()
+		author_guid = self.NewGUID()
+		# Object IDs of the page objects are (objects_guid, n)
+		objects_guid = self.NewGUID()
+		file_data_reference = '<ifndf>{%s}' % (str(UUID(bytes_le=file_data_guid)).upper(),)
+
+		page_revisions = []
+		contexts = []
+		prev_rid = None
+		for r in range(revisions):
+			rid = self.NewGUID()
+			context = self.NewGUID()
+			contexts.append(context)
+			guids = [objects_guid, author_guid, file_data_guid]
+			# Each two revisions have same text
+			text = "Page %d revision %d" % (page_index, r // 2)
+			page_width = 8.5 if same_page_width else 8.5 + r
+			text_style = PropertyBody([(PID.Bold | 0x80000000, b''), (PID.ParagraphStyle, b'')])
+			objects = [
+				(CompactID(0, 1), JCID.jcidPageManifestNode, PropertySet(
+					[(PID.ContentChildNodes, struct.pack('<I', 1))], [CompactID(0, 2)]), False),
+				(CompactID(0, 2), JCID.jcidPageNode, PropertySet(
+					[(PID.ElementChildNodes, struct.pack('<I', 3)), (PID.PageWidth, struct.pack('<f', page_width)),
+					(PID_UndocumentedBlob, Prefixed(b'\x01\x02\x03')), (PID_UndocumentedBool, b'')],
+					[CompactID(0, 3), CompactID(0, 8), CompactID(0, 12)]), False),
+				(CompactID(0, 3), JCID.jcidOutlineNode, PropertySet(
+					[(PID.ElementChildNodes, struct.pack('<I', 1)), (PID.LayoutMaxWidth, struct.pack('<f', 3.25)),
+					(PID.RgOutlineIndentDistance, Prefixed(b'\x01\0\0\0' + struct.pack('<f', 1.5)))],
+					[CompactID(0, 4)]), False),
+				(CompactID(0, 4), JCID.jcidOutlineElementNode, PropertySet(
+					[(PID.ContentChildNodes, struct.pack('<I', 1))], [CompactID(0, 5)]), False),
+				(CompactID(0, 5), JCID.jcidRichTextOENode, PropertySet(
+					[(PID.RichEditTextUnicode, Prefixed(Utf16(text))),
+					(PID.TextRunIndex, Prefixed(struct.pack('<I', 5))),
+					(PID.TextRunFormatting, struct.pack('<I', 2)),
+					(PID.LanguageID, struct.pack('<I', 0x409)),
+					(PID_UndocumentedArrayOfPropertyValues, struct.pack('<II', 2, PID_UndocumentedPropertyValue)
+						+ PropertyBody([(PID.PageLevel, struct.pack('<I', 7))])
+						+ PropertyBody([(PID.ParagraphStyle, b'')])),
+					(PID_UndocumentedPropertyValue, text_style)],
+					[CompactID(0, 10), CompactID(0, 11), CompactID(0, 10), CompactID(0, 11)]), False),
+				(CompactID(0, 10), JCID.jcidParagraphStyleObject, PropertySet(
+					[(PID.Bold | 0x80000000, b''), (PID.Font, Prefixed(Utf16('Calibri')))]), True),
+				(CompactID(0, 11), JCID.jcidParagraphStyleObject, PropertySet(
+					[(PID.Font, Prefixed(Utf16('Arial'))), (PID.FontSize, struct.pack('<H', 20))]), True),
+				(CompactID(0, 6), JCID.jcidPageMetaData, PropertySet(
+					[(PID.NotebookManagementEntityGuid, Prefixed(page_guid)),
+					(PID.CachedTitleString, Prefixed(Utf16('Page %d title' % (page_index,)))),
+					(PID.PageLevel, struct.pack('<I', 1)),
+					(PID.TopologyCreationTimeStamp, struct.pack('<Q', FILETIME_1970 + 10**7 * 1000))]), False),
+				(CompactID(0, 7), JCID.jcidRevisionMetaData, PropertySet(
+					[(PID.LastModifiedTimeStamp, struct.pack('<Q', FILETIME_1970 + 10**7 * (2000 + r * 3600))),
+					(PID.AuthorMostRecent, b'')], [CompactID(1, 1)]), False),
+				(CompactID(1, 1), JCID.jcidReadOnlyAuthor, PropertySet(
+					[(PID.Author, Prefixed(Utf16('Alice')))]), True),
+				(CompactID(0, 8), JCID.jcidEmbeddedFileNode, PropertySet(
+					[(PID.EmbeddedFileContainer, b''), (PID.EmbeddedFileName, Prefixed(Utf16('x.bin')))],
+					[CompactID(0, 9)]), False),
+				(None, CompactID(0, 9), JCID.jcidEmbeddedFileContainer, file_data_reference, '.bin'),
+				(CompactID(0, 12), JCID.jcidTitleNode, PropertySet(
+					[(PID_UndocumentedObjectID, b'')], [CompactID(0, 13)]), False),
+				(CompactID(0, 13), JCID.jcidNumberListNode, PropertySet(
+					[(PID_UndocumentedBlob, Prefixed(b'Note %d' % (r // 2 if same_page_width else r,)))]), False),
+			]
+			dependent = prev_rid is not None and (all_dependent or r % 2 == 1)
+			if dependent:
+				# A dependent revision only redeclares a subset of objects
+				keep = {CompactID(0, 2), CompactID(0, 5), CompactID(0, 7), CompactID(0, 10), CompactID(0, 13), CompactID(1, 1)}
+				objects = [obj for obj in objects if obj[0] in keep or obj[0] is None and obj[1] in keep]
+			group_id = self.NewGUID()
+			page_revisions.append(dict(rid=rid, dep=prev_rid if dependent else None,
+				groups=[(group_id, self.ObjectGroup(group_id, guids, objects))],
+				roots=[(1, ExGUID(objects_guid, 1)), (2, ExGUID(objects_guid, 6)), (4, ExGUID(objects_guid, 7))],
+				context=ExGUID(context, 1)))
+			prev_rid = rid
+			continue
+
+		# Version history revision, with a proxy per each previous revision context
+		history_guid = self.NewGUID()
+		guids = [history_guid, NULL_GUID]
+		guids += [self.NewGUID() for _ in contexts[:-1]]
+		contexts_index = len(guids)
+		guids += contexts[:-1]
+		objects = [(CompactID(0, 1), JCID.jcidVersionHistoryContent, PropertySet(
+			[(PID.ElementChildNodes, struct.pack('<I', len(contexts) - 1))],
+			[CompactID(2 + i, 1) for i in range(len(contexts) - 1)]), False)]
+		for i in range(len(contexts) - 1):
+			objects.append((CompactID(2 + i, 1), JCID.jcidVersionProxy, PropertySet(
+				[(PID.VersionHistoryGraphSpaceContextNodes, struct.pack('<I', 1))],
+				osids=[], context_ids=[CompactID(contexts_index + i, 1)]), False))
+			continue
+		group_id = self.NewGUID()
+		history_revision = dict(rid=self.NewGUID(), dep=None,
+			groups=[(group_id, self.ObjectGroup(group_id, guids, objects))],
+			roots=[(1, ExGUID(history_guid, 1))], context=ExGUID(REVISION_HISTORY_CONTEXT, 1))
+		# The last content revision goes after the history
+		page_revisions.insert(len(page_revisions) - 1, history_revision)
+		return gosid, self.ObjectSpace(gosid, page_revisions)
+
+	def Section(self, page_gosids):
+		gosid = self.NewGUID()
+		objects_guid = self.NewGUID()
+		objects = [
+			(CompactID(0, 1), JCID.jcidSectionNode, PropertySet(
+				[(PID.ElementChildNodes, struct.pack('<I', 1))], [CompactID(0, 2)]), False),
+			(CompactID(0, 2), JCID.jcidPageSeriesNode, PropertySet(
+				[(PID.ChildGraphSpaceElementNodes, struct.pack('<I', len(page_gosids))),
+				(PID.TopologyCreationTimeStamp, struct.pack('<Q', FILETIME_1970 + 10**7 * 1500))],
+				[], osids=[CompactID(1 + i, 1) for i in range(len(page_gosids))]), False),
+		]
+		group_id = self.NewGUID()
+		revision = dict(rid=self.NewGUID(), dep=None,
+			groups=[(group_id, self.ObjectGroup(group_id, [objects_guid] + list(page_gosids), objects))],
+			roots=[(1, ExGUID(objects_guid, 1))], context=None)
+		return gosid, self.ObjectSpace(gosid, [revision])
+
+	def FileDataStore(self, guid:bytes, data:bytes):
+		store_object = FILE_DATA_STORE_OBJECT_HEADER + struct.pack('<QIQ', len(data), 0, 0) + data
+		while (len(store_object) + 16) % 8:
+			store_object += b'\0'
+		store_object += FILE_DATA_STORE_OBJECT_FOOTER
+		return self.FileNodeList([self.FileNode(ID.FileDataStoreObjectReferenceFND, guid,
+						base_type=1, ref=self.Alloc(store_object))])
+
+	def Header(self, file_guid:bytes, root_list_ref):
+		header = ONE_SECTION_FILE_TYPE + file_guid + NULL_GUID + ONE_FILE_FORMAT
+		header += struct.pack('<IIII', 0x2A, 0x2A, 0x2A, 0x2A)
+		header += struct.pack('<II', 0, 0) * 2
+		header += struct.pack('<IIQ', 0, 0, 0)
+		header += struct.pack('<II', 0, 0) + struct.pack('<I', 0) + b'\0\0\0\0' + NULL_GUID + struct.pack('<I', 0)
+		header += struct.pack('<QI', 0, 0) * 2
+		header += struct.pack('<QI', *root_list_ref)
+		header += struct.pack('<QI', 0, 0)
+		header += struct.pack('<QQ', len(self.buf), 0)
+		header += self.NewGUID() + struct.pack('<Q', 1) + NULL_GUID + struct.pack('<I', 0)
+		header += struct.pack('<QI', 0, 0) * 2 + struct.pack('<IIII', 0, 0, 0, 0)
+		assert(len(header) <= 1024)
+		self.buf[0:len(header)] = header
+		return
+
+def MakeSampleFile(path, revisions:int=5, pages:int=1, seed:int=1, same_page_width:bool=False,
+					all_dependent:bool=False):
+	'''
+	Writes a section file with the given number of pages, each with the given number of content revisions.
+	If same_page_width is set, the revisions with same text are identical,
+	otherwise the page width is different in each revision.
+	If all_dependent is set, each content revision depends on the previous one,
+	otherwise every other revision does.
+	'''
+	writer = SampleFileWriter(seed)
+	file_guid = writer.NewGUID()
+	file_data_guid = writer.NewGUID()
+	file_data = bytes(writer.random.getrandbits(8) for _ in range(3000))
+
+	page_spaces = [writer.Page(i, revisions, file_data_guid, same_page_width, all_dependent) for i in range(pages)]
+	section_gosid, section_ref = writer.Section([gosid for gosid, _ in page_spaces])
+
+	root_nodes = [writer.FileNode(ID.ObjectSpaceManifestListReferenceFND, ExGUID(section_gosid, 1), base_type=2, ref=section_ref)]
+	for gosid, ref in page_spaces:
+		root_nodes.append(writer.FileNode(ID.ObjectSpaceManifestListReferenceFND, ExGUID(gosid, 1), base_type=2, ref=ref))
+		continue
+	root_nodes.append(writer.FileNode(ID.ObjectSpaceManifestRootFND, ExGUID(section_gosid, 1)))
+	root_nodes.append(writer.FileNode(ID.FileDataStoreListReferenceFND, base_type=2,
+						ref=writer.FileDataStore(file_data_guid, file_data)))
+	root_list_ref = writer.FileNodeList(root_nodes, nodes_per_fragment=2)
+
+	writer.Header(file_guid, root_list_ref)
+	with open(path, 'wb') as fd:
+		fd.write(writer.buf)
+	return
+
+if __name__ == "__main__":
+	import sys
+	MakeSampleFile(sys.argv[1], *(int(arg) for arg in sys.argv[2:]))
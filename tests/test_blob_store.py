@@ -0,0 +1,132 @@
+#   Copyright 2024 Alexandre Grigoriev
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+# Tests of '--blob-store' option: the embedded files are written once to 'blobs' subdirectory,
+# and the version directories refer to the same data as the output without the option.
+
+import os
+import sys
+import unittest
+import subprocess
+import tempfile
+from hashlib import md5
+from pathlib import Path
+
+from sample_file import MakeSampleFile
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+# Script and output options
+OUTPUTS = (
+	['--output-directory'],
+	['--all-revisions', '--output-directory'],
+	['--all-revisions', '--incremental', '--output-directory'],
+)
+
+def ReadOutput(path:Path)->dict:
+	# Returns contents of all files in the output directory, except for the blob store, by relative path.
+	# The links are followed
+	return {file.relative_to(path).as_posix() : file.read_bytes() for file in sorted(path.rglob('*'))
+			if file.is_file() and file.relative_to(path).parts[0] != 'blobs'}
+
+def IsDataFile(name:str)->bool:
+	# The pages are written as XML, and the indexes as text
+	return Path(name).suffix not in ('.xml', '.txt')
+
+class BlobStoreTest(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.temp_dir = tempfile.TemporaryDirectory()
+		cls.directory = Path(cls.temp_dir.name)
+		cls.sample_file = cls.directory / 'sample.one'
+		MakeSampleFile(cls.sample_file, revisions=6, pages=2)
+		return
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.temp_dir.cleanup()
+		return
+
+	def MakeOutput(self, output_options:list, options:list, output_name:str)->Path:
+		output = self.directory / output_name
+		subprocess.run([sys.executable, str(REPO_DIR / '1note2xml.py'), str(self.sample_file)]
+				+ options + output_options + [str(output)],
+				cwd=REPO_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+		return output
+
+	def CheckBlobs(self, output:Path, expected:dict):
+		# Each blob is named by MD5 hash of its data, and is one of the embedded files
+		blobs = {}
+		for blob in (output / 'blobs').iterdir():
+			data = blob.read_bytes()
+			self.assertEqual(md5(data).hexdigest(), blob.stem)
+			blobs[blob.name] = data
+			continue
+		data_files = {name : data for name, data in expected.items() if IsDataFile(name)}
+		self.assertTrue(data_files)
+		self.assertEqual(set(data_files.values()), set(blobs.values()))
+		return blobs
+
+	def test_links(self):
+		for i, output_options in enumerate(OUTPUTS):
+			expected = ReadOutput(self.MakeOutput(output_options, [], 'plain.%d' % (i,)))
+			for blob_store in ('hardlink', 'symlink'):
+				with self.subTest(output=output_options, blob_store=blob_store):
+					output = self.MakeOutput(output_options, ['--blob-store', blob_store], '%s.%d' % (blob_store, i))
+					self.CheckBlobs(output, expected)
+					# The links resolve to the same data as the files written without the option
+					self.assertEqual(expected, ReadOutput(output))
+					for name in expected:
+						if not IsDataFile(name):
+							continue
+						path = output / name
+						blob = output / 'blobs' / (md5(expected[name]).hexdigest() + path.suffix)
+						self.assertEqual(blob_store == 'symlink', path.is_symlink())
+						self.assertTrue(os.path.samefile(blob, path))
+						continue
+				continue
+			continue
+		return
+
+	def test_manifest(self):
+		for i, output_options in enumerate(OUTPUTS):
+			expected = ReadOutput(self.MakeOutput(output_options, [], 'plain.%d' % (i,)))
+			with self.subTest(output=output_options):
+				output = self.MakeOutput(output_options, ['--blob-store', 'manifest'], 'manifest.%d' % (i,))
+				self.CheckBlobs(output, expected)
+
+				# The embedded files are only listed in blobs.txt of each directory
+				files = {}
+				for name, data in ReadOutput(output).items():
+					path = Path(name)
+					self.assertFalse(IsDataFile(name))
+					if path.name != 'blobs.txt':
+						files[name] = data
+						continue
+					for line in data.decode().splitlines():
+						filename, _, blob_path = line.partition(':')
+						self.assertNotIn('\\', blob_path)
+						self.assertEqual('blobs', Path(blob_path).parent.name)
+						blob = output / path.parent / blob_path
+						self.assertTrue(blob.is_file())
+						files[(path.parent / filename).as_posix()] = blob.read_bytes()
+						continue
+					continue
+				self.assertEqual(expected, files)
+			continue
+		return
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,91 @@
+#   Copyright 2024 Alexandre Grigoriev
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+# Tests of the dense and sparse Global ID Table
+
+import unittest
+from types import SimpleNamespace
+
+from ONE.base_types import InternGUID, CompactID
+from ONE.STORE.filenode import FileNodeID as ID
+from ONE.STORE.global_id_table import GlobalIdTable, SPARSE_TABLE_GAP
+
+def MakeGUID(i:int):
+	return InternGUID(i.to_bytes(16, 'little'))
+
+def Entry(index:int, guid):
+	return SimpleNamespace(ID=ID.GlobalIdTableEntryFNDX.value, index=index, guid=guid)
+
+def Entry3(copy_from:int, count:int, copy_to:int):
+	return SimpleNamespace(ID=ID.GlobalIdTableEntry3FNDX.value,
+				iIndexCopyFromStart=copy_from, cEntriesToCopy=count, iIndexCopyToStart=copy_to)
+
+def MakeTable(nodes:list, prev_global_id_table=None)->GlobalIdTable:
+	nodes = nodes + [SimpleNamespace(ID=ID.GlobalIdTableEndFNDX.value)]
+	return GlobalIdTable(iter(nodes), prev_global_id_table)
+
+class GlobalIdTableTest(unittest.TestCase):
+	def test_dense(self):
+		table = MakeTable([Entry(i, MakeGUID(i)) for i in (0, 1, 3)])
+		self.assertFalse(table.IsSparse())
+		self.assertEqual(4, len(table.table))
+		exguid = table.GetExGUID(3, 5)
+		self.assertEqual(MakeGUID(3).guid, exguid.guid)
+		self.assertEqual(5, exguid.n)
+		self.assertEqual([MakeGUID(0), MakeGUID(1)], table.GetRange(0, 2))
+		# Unused slot and an index past the end
+		self.assertRaises(KeyError, table.GetExGUID, 2, 0)
+		self.assertRaises(KeyError, table.GetExGUID, 4, 0)
+		self.assertRaises(KeyError, table.GetRange, 1, 2)
+		self.assertRaises(KeyError, table.GetRange, 3, 2)
+		return
+
+	def test_gap_boundary(self):
+		# The list is extended up to SPARSE_TABLE_GAP slots past the end
+		table = MakeTable([Entry(SPARSE_TABLE_GAP - 1, MakeGUID(1))])
+		self.assertFalse(table.IsSparse())
+		self.assertEqual(SPARSE_TABLE_GAP, len(table.table))
+
+		table = MakeTable([Entry(SPARSE_TABLE_GAP, MakeGUID(1))])
+		self.assertTrue(table.IsSparse())
+		return
+
+	def test_sparse(self):
+		far_index = 0xFFFFFF
+		table = MakeTable([Entry(0, MakeGUID(0)), Entry(1, MakeGUID(1)),
+					Entry(far_index, MakeGUID(2))])
+		self.assertTrue(table.IsSparse())
+		self.assertEqual(3, len(table.table))
+
+		compact_id = CompactID(word=(far_index << 8) | 7)
+		exguid = table[compact_id]
+		self.assertEqual(MakeGUID(2).guid, exguid.guid)
+		self.assertEqual(7, exguid.n)
+		self.assertEqual(MakeGUID(1).guid, table.GetExGUID(1, 0).guid)
+		self.assertEqual([MakeGUID(0), MakeGUID(1)], table.GetRange(0, 2))
+
+		self.assertRaises(KeyError, table.GetExGUID, 2, 0)
+		self.assertRaises(KeyError, table.GetRange, far_index, 2)
+		# More entries than the table has
+		self.assertRaises(KeyError, table.GetRange, 0, 4)
+
+		# A following table copies from the sparse table
+		next_table = MakeTable([Entry3(0, 2, 10), Entry3(far_index, 1, 12)], table)
+		self.assertFalse(next_table.IsSparse())
+		self.assertEqual([MakeGUID(0), MakeGUID(1), MakeGUID(2)], next_table.GetRange(10, 3))
+		return
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,382 @@
+#   Copyright 2024 Alexandre Grigoriev
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+# Tests of the object tree builder: reuse of the objects and contents built in other revisions,
+# the properties not built at low verbosity levels, and the cached plans to build properties
+
+import unittest
+from unittest import mock
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from sample_file import MakeSampleFile, PID_UndocumentedArrayOfPropertyValues, PID_UndocumentedPropertyValue, \
+	PID_UndocumentedObjectID
+from ONE.base_types import InternExGUID
+from ONE.NOTE.onenote import OneNote
+from ONE.NOTE.object_tree_builder import RevisionBuilderCtx
+from ONE.NOTE.property_set_object_factory import PRUNED_PROPERTY_MIN_VERBOSITY, PropertiesPlanCache
+
+# Object IDs of the sample page objects, by their 'n'
+PAGE_MANIFEST = 1
+PAGE_NODE = 2
+OUTLINE = 3
+OUTLINE_ELEMENT = 4
+RICH_TEXT = 5
+PAGE_METADATA = 6
+REVISION_METADATA = 7
+EMBEDDED_FILE = 8
+TITLE = 12
+NOTE = 13
+
+class TreeBuilderTestCase(unittest.TestCase):
+	SAME_PAGE_WIDTH = False
+	PAGES = 1
+
+	@classmethod
+	def setUpClass(cls):
+		cls.temp_dir = tempfile.TemporaryDirectory()
+		cls.path = Path(cls.temp_dir.name) / 'sample.one'
+		# Every other revision depends on the previous one, and only redeclares
+		# the page node, the text node and the revision metadata
+		MakeSampleFile(cls.path, revisions=6, pages=cls.PAGES, same_page_width=cls.SAME_PAGE_WIDTH)
+		return
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.temp_dir.cleanup()
+		return
+
+	def setUp(self):
+		self.onenote = OneNote.open(self.path, None)
+		return
+
+	def tearDown(self):
+		self.onenote.close()
+		return
+
+	def MakeBuilder(self, verbosity:int=0):
+		return self.onenote.GetDefaultTreeBuilder(SimpleNamespace(verbosity=verbosity))
+
+	def GetPageVersions(self, builder)->list:
+		# Returns the content revisions of the page, in order of timestamps
+		for gosid, object_space_ctx in builder.object_spaces.items():
+			if gosid != builder.root_gosid:
+				return object_space_ctx.versions
+			continue
+		return None
+
+	@staticmethod
+	def GetObject(revision_ctx, n:int):
+		# The objects are looked up in the built contents tree
+		revision_ctx.GetRootObject()
+		return revision_ctx.GetObjectReference(InternExGUID(revision_ctx.contents_oid.guid, n))
+
+class ObjectCacheTest(TreeBuilderTestCase):
+	def test_reuse(self):
+		versions = self.GetPageVersions(self.MakeBuilder())
+		self.assertEqual(6, len(versions))
+		for i in range(0, len(versions), 2):
+			revision_ctx, dependent_ctx = versions[i], versions[i + 1]
+			with self.subTest(revision=i):
+				# Not redeclared in the dependent revision, and not referring to other objects
+				self.assertIs(self.GetObject(revision_ctx, PAGE_METADATA), self.GetObject(dependent_ctx, PAGE_METADATA))
+				# Refers to the embedded file, shared by the revisions
+				self.assertIs(self.GetObject(revision_ctx, EMBEDDED_FILE), self.GetObject(dependent_ctx, EMBEDDED_FILE))
+				# The reused object's embedded file is registered in the dependent revision, as well
+				self.assertTrue(revision_ctx.data_objects)
+				self.assertEqual(revision_ctx.data_objects.keys(), dependent_ctx.data_objects.keys())
+				# Redeclared in the dependent revision
+				self.assertIsNot(self.GetObject(revision_ctx, PAGE_NODE), self.GetObject(dependent_ctx, PAGE_NODE))
+				# Not redeclared, but referring to redeclared objects, directly or through other objects
+				for n in (PAGE_MANIFEST, OUTLINE, OUTLINE_ELEMENT):
+					self.assertIsNot(self.GetObject(revision_ctx, n), self.GetObject(dependent_ctx, n))
+					continue
+			if i:
+				# A revision which doesn't depend on the previous one has all its own property sets
+				self.assertIsNot(self.GetObject(versions[i - 1], PAGE_METADATA), self.GetObject(revision_ctx, PAGE_METADATA))
+			continue
+		return
+
+	def test_reference_property(self):
+		# The title node is not redeclared in the dependent revision, but refers to the note node, which is,
+		# by a property not emitted at verbosity 0
+		versions = self.GetPageVersions(self.MakeBuilder(0))
+		for i in range(0, len(versions), 2):
+			revision_ctx, dependent_ctx = versions[i], versions[i + 1]
+			with self.subTest(revision=i):
+				oid = InternExGUID(revision_ctx.contents_oid.guid, TITLE)
+				self.assertIs(revision_ctx.revision.GetObjectById(oid), dependent_ctx.revision.GetObjectById(oid))
+				self.assertIsNot(self.GetObject(revision_ctx, TITLE), self.GetObject(dependent_ctx, TITLE))
+				for ctx in (revision_ctx, dependent_ctx):
+					title = self.GetObject(ctx, TITLE)
+					self.assertIs(self.GetObject(ctx, NOTE), title.get(PID_UndocumentedObjectID).get_object_value())
+					continue
+			continue
+		return
+
+	def test_changed_dependency(self):
+		revision_ctx = self.GetPageVersions(self.MakeBuilder())[0]
+		outline_element = self.GetObject(revision_ctx, OUTLINE_ELEMENT)
+		oid = outline_element._oid
+		prop_set = revision_ctx.revision.GetObjectById(oid)
+		self.assertIs(outline_element, revision_ctx.GetCachedObject(prop_set, oid))
+
+		# The cached object is not reused if an object it refers to resolves differently
+		key = (id(prop_set), oid, revision_ctx.property_set_factory)
+		cached_prop_set, obj, dependencies = revision_ctx.object_cache[key]
+		self.assertEqual([RICH_TEXT], [dependency[0].n for dependency in dependencies])
+		revision_ctx.object_cache[key] = (cached_prop_set, obj, ((dependencies[0][0], object()),))
+		self.assertIsNone(revision_ctx.GetCachedObject(prop_set, oid))
+
+		# A different property set with the same id() is not mistaken for the cached one
+		revision_ctx.object_cache[key] = (object(), obj, dependencies)
+		self.assertIsNone(revision_ctx.GetCachedObject(prop_set, oid))
+		return
+
+	def test_factory_key(self):
+		# Builders with different property set factories don't share the objects
+		versions = self.GetPageVersions(self.MakeBuilder())
+		xml_versions = self.GetPageVersions(self.onenote.GetXmlBuilder(SimpleNamespace(verbosity=0)))
+		obj = self.GetObject(versions[0], PAGE_METADATA)
+		xml_obj = self.GetObject(xml_versions[0], PAGE_METADATA)
+		self.assertIsNot(obj, xml_obj)
+		self.assertIsNot(type(obj), type(xml_obj))
+		return
+
+class PrunedPropertiesTest(TreeBuilderTestCase):
+	def GetObjects(self, verbosity:int, n:int):
+		# Returns the object from the first revision, and the same object built with all properties
+		revision_ctx = self.GetPageVersions(self.MakeBuilder(verbosity))[0]
+		full_revision_ctx = self.GetPageVersions(self.MakeBuilder(5))[0]
+		return self.GetObject(revision_ctx, n), self.GetObject(full_revision_ctx, n)
+
+	def test_pruned(self):
+		page_node, full_page_node = self.GetObjects(0, PAGE_NODE)
+		self.assertFalse(full_page_node._pruned_properties)
+		self.assertIn('PageWidth', page_node._pruned_properties)
+		# The properties used by the tree builders are always built
+		self.assertNotIn('ElementChildNodes', page_node._pruned_properties)
+		self.assertEqual(full_page_node.ElementChildNodes[0]._jcid_name, page_node.ElementChildNodes[0]._jcid_name)
+
+		# The properties referring to other objects are never pruned
+		rich_text, _ = self.GetObjects(0, RICH_TEXT)
+		self.assertIn('LanguageID', rich_text._pruned_properties)
+		self.assertNotIn(PID_UndocumentedArrayOfPropertyValues, rich_text._pruned_properties)
+		self.assertNotIn(PID_UndocumentedPropertyValue, rich_text._pruned_properties)
+		self.assertIn(PID_UndocumentedPropertyValue, rich_text._properties)
+
+		revision_metadata, _ = self.GetObjects(0, REVISION_METADATA)
+		self.assertNotIn('LastModifiedTimeStamp', revision_metadata._pruned_properties)
+		self.assertNotIn('AuthorMostRecent', revision_metadata._pruned_properties)
+		self.assertEqual('Alice', revision_metadata.AuthorMostRecent.Author)
+		return
+
+	def test_build_on_access(self):
+		page_node, full_page_node = self.GetObjects(0, PAGE_NODE)
+		page_hash = page_node.get_hash()
+		self.assertEqual(full_page_node.PageWidth, page_node.PageWidth)
+		self.assertNotIn('PageWidth', page_node._pruned_properties)
+		self.assertEqual(full_page_node.PageWidth, page_node.PageWidth)
+		# The hash only includes the properties emitted at the verbosity level
+		self.assertEqual(page_hash, page_node.get_hash())
+
+		outline, full_outline = self.GetObjects(0, OUTLINE)
+		self.assertIn('LayoutMaxWidth', outline._pruned_properties)
+		self.assertIsNotNone(outline.get('LayoutMaxWidth'))
+		self.assertNotIn('LayoutMaxWidth', outline._pruned_properties)
+
+		# Iteration builds all properties
+		self.assertEqual([path for path, _ in full_outline], [path for path, _ in outline])
+		self.assertFalse(outline._pruned_properties)
+		return
+
+	def test_verbosity_levels(self):
+		# A property is built if its minimum verbosity is at or below the requested level
+		page_node, _ = self.GetObjects(3, PAGE_NODE)
+		self.assertNotIn('PageWidth', page_node._pruned_properties)
+		self.assertTrue(page_node._pruned_properties)
+
+		# Nothing is pruned at PRUNED_PROPERTY_MIN_VERBOSITY and above
+		revision_ctx = self.GetPageVersions(self.MakeBuilder(PRUNED_PROPERTY_MIN_VERBOSITY))[0]
+		revision_ctx.GetRootObject()
+		self.assertTrue(revision_ctx.obj_dict)
+		for oid, obj in revision_ctx.obj_dict.items():
+			with self.subTest(oid=str(oid)):
+				self.assertFalse(obj._pruned_properties)
+			continue
+		return
+
+class PropertySubset:
+	# Stands for a property set with the given property indices of another property set
+	def __init__(self, property_set, indices):
+		self.property_set = property_set
+		self.indices = list(indices)
+		return
+
+	def PropertyIDs(self):
+		prop_ids = self.property_set.PropertyIDs()
+		return [prop_ids[i] for i in self.indices]
+
+	def MakeProperty(self, i:int):
+		return self.property_set.MakeProperty(self.indices[i])
+
+class PropertiesPlanTest(TreeBuilderTestCase):
+	def setUp(self):
+		super().setUp()
+		PropertiesPlanCache.clear()
+		return
+
+	def GetPageNodes(self, builder):
+		# Returns the page node objects and their property sets, of two revisions with different page width
+		versions = self.GetPageVersions(builder)
+		page_nodes = [self.GetObject(revision_ctx, PAGE_NODE) for revision_ctx in versions[:2]]
+		prop_sets = [revision_ctx.revision.GetObjectById(page_node._oid)
+						for revision_ctx, page_node in zip(versions, page_nodes)]
+		self.assertIsNot(prop_sets[0], prop_sets[1])
+		self.assertNotEqual(page_nodes[0].PageWidth, page_nodes[1].PageWidth)
+		return page_nodes, prop_sets
+
+	def test_same_plan(self):
+		page_nodes, prop_sets = self.GetPageNodes(self.MakeBuilder(5))
+		key = (type(page_nodes[0]), page_nodes[0]._jcid.jcid, tuple(prop_sets[0].PropertyIDs()))
+		self.assertIn(key, PropertiesPlanCache)
+		plan = PropertiesPlanCache[key]
+		# Same property IDs of the same JCID share the plan
+		self.assertIs(plan, page_nodes[0].GetPropertiesPlan(prop_sets[0]))
+		self.assertIs(plan, page_nodes[1].GetPropertiesPlan(prop_sets[1]))
+
+		# The plan is in order of the built properties
+		self.assertEqual(len(page_nodes[0]._properties), len(plan))
+		self.assertEqual(list(page_nodes[0]._properties),
+				[property_class(prop_sets[0].MakeProperty(i)).key for i, property_class, *_ in plan])
+		return
+
+	def test_different_keys(self):
+		builder = self.MakeBuilder(5)
+		page_nodes, prop_sets = self.GetPageNodes(builder)
+		page_node, prop_set = page_nodes[0], prop_sets[0]
+		plan = page_node.GetPropertiesPlan(prop_set)
+		count = len(prop_set.PropertyIDs())
+
+		# Different property IDs get a different plan
+		subset = PropertySubset(prop_set, range(count - 1))
+		subset_plan = page_node.GetPropertiesPlan(subset)
+		self.assertIsNot(plan, subset_plan)
+		self.assertEqual(count - 1, len(subset_plan))
+		self.assertIs(subset_plan, page_node.GetPropertiesPlan(PropertySubset(prop_set, range(count - 1))))
+
+		# Same as in the property set, the last property with the same ID wins
+		duplicate = PropertySubset(prop_set, [0] + list(range(count)))
+		duplicate_plan = page_node.GetPropertiesPlan(duplicate)
+		self.assertEqual(count, len(duplicate_plan))
+		self.assertNotIn(0, [i for i, *_ in duplicate_plan])
+
+		# The objects of another factory make their own plans
+		xml_page_node = self.GetObject(self.GetPageVersions(self.onenote.GetXmlBuilder(SimpleNamespace(verbosity=5)))[0], PAGE_NODE)
+		self.assertIsNot(type(page_node), type(xml_page_node))
+		self.assertIsNot(plan, xml_page_node.GetPropertiesPlan(prop_set))
+		self.assertIn((type(xml_page_node), page_node._jcid.jcid, tuple(prop_set.PropertyIDs())), PropertiesPlanCache)
+		return
+
+class SameContentsTest(TreeBuilderTestCase):
+	# Each two revisions have identical contents
+	SAME_PAGE_WIDTH = True
+
+	def test_same_contents(self):
+		versions = self.GetPageVersions(self.MakeBuilder())
+		self.assertEqual(6, len(versions))
+		for i in range(0, len(versions), 2):
+			revision_ctx, same_ctx = versions[i], versions[i + 1]
+			with self.subTest(revision=i):
+				# The page node is redeclared with same data
+				oid = InternExGUID(revision_ctx.contents_oid.guid, PAGE_NODE)
+				self.assertIsNot(revision_ctx.revision.GetObjectById(oid), same_ctx.revision.GetObjectById(oid))
+				# The contents have same raw hash, and are built once
+				root_obj = revision_ctx.GetRootObject()
+				self.assertIs(root_obj, same_ctx.GetRootObject())
+				self.assertEqual(revision_ctx.page_hash, same_ctx.page_hash)
+				self.assertEqual(revision_ctx.data_objects.keys(), same_ctx.data_objects.keys())
+				if i:
+					self.assertIsNot(versions[i - 1].GetRootObject(), root_obj)
+			continue
+		return
+
+class BuildContentsTest(TreeBuilderTestCase):
+	PAGES = 2
+
+	def test_snapshot(self):
+		# Only the current revision of each page is built for a snapshot export
+		options = SimpleNamespace(verbosity=0)
+		builder = self.onenote.GetXmlBuilder(options)
+		with tempfile.TemporaryDirectory() as directory, \
+			mock.patch.object(RevisionBuilderCtx, 'BuildContents', autospec=True,
+							side_effect=RevisionBuilderCtx.BuildContents) as build_contents:
+			builder.MakeVersionFiles(Path(directory) / 'snapshot', options)
+			self.assertTrue(list((Path(directory) / 'snapshot').glob('*.xml')))
+
+		built = [call.args[0] for call in build_contents.call_args_list]
+		self.assertEqual(self.PAGES, len(built))
+		self.assertEqual(self.PAGES, len(set(revision_ctx.gosid for revision_ctx in built)))
+		for revision_ctx in built:
+			object_space = revision_ctx.onestore.GetObjectSpace(revision_ctx.gosid)
+			self.assertEqual(object_space.GetDefaultContextRevisionId(), revision_ctx.rid)
+			continue
+		return
+
+	def test_all_revisions(self):
+		# The version timeline doesn't build the contents
+		builder = self.MakeBuilder()
+		with mock.patch.object(RevisionBuilderCtx, 'BuildContents', autospec=True) as build_contents:
+			self.assertEqual(6, len(builder.GetVersionTimeline()))
+		build_contents.assert_not_called()
+
+		# The versions are made from the built contents
+		self.assertTrue(builder.GetVersions())
+		for revision_ctx_list in builder.GetVersionTimeline():
+			self.assertEqual(self.PAGES, len(revision_ctx_list))
+			for revision_ctx in revision_ctx_list:
+				self.assertTrue(revision_ctx.contents_built)
+				continue
+			continue
+		return
+
+	def test_failed_build(self):
+		class TestException(Exception):
+			pass
+
+		make_object = RevisionBuilderCtx.MakeObject
+		def FailingMakeObject(revision_ctx, prop_set, oid=None):
+			if oid is not None and oid.n == NOTE:
+				raise TestException()
+			return make_object(revision_ctx, prop_set, oid)
+
+		revision_ctx = self.GetPageVersions(self.MakeBuilder())[0]
+		with mock.patch.object(RevisionBuilderCtx, 'MakeObject', autospec=True, side_effect=FailingMakeObject):
+			self.assertRaises(TestException, revision_ctx.GetRootObject)
+			# The revision is left not built, and the build is retried on next access
+			self.assertFalse(revision_ctx.contents_built)
+			self.assertNotIn('page_hash', vars(revision_ctx))
+			self.assertNotIn(NotImplemented, revision_ctx.obj_dict.values())
+			self.assertRaises(TestException, getattr, revision_ctx, 'page_hash')
+
+		self.assertIsNotNone(revision_ctx.GetRootObject())
+		self.assertTrue(revision_ctx.contents_built)
+		self.assertIsNotNone(revision_ctx.page_hash)
+		self.assertIsNotNone(self.GetObject(revision_ctx, NOTE))
+		return
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,95 @@
+#   Copyright 2024 Alexandre Grigoriev
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+# Regression tests of the file reading options: the XML and JSON output
+# must be the same, with or without '--mmap', '--lazy' and '--prefetch'.
+
+import sys
+import unittest
+import subprocess
+import tempfile
+from pathlib import Path
+
+from sample_file import MakeSampleFile
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+READING_OPTIONS = (
+	['--mmap'],
+	['--lazy'],
+	['--mmap', '--prefetch'],
+	['--mmap', '--lazy', '--prefetch'],
+)
+
+# Script and output options
+OUTPUTS = (
+	('1note2xml.py', ['--output']),
+	('1note2xml.py', ['--all-revisions', '--output']),
+	('1note2xml.py', ['--all-revisions', '--verbose', '5', '--output']),
+	('1note2xml.py', ['--output-directory']),
+	('1note2json.py', ['--output']),
+	('1note2json.py', ['--incremental', '--output-directory']),
+)
+
+def ReadOutput(path:Path)->dict:
+	# Returns contents of the output file, or all files in the output directory, by relative path
+	if path.is_file():
+		return {'': path.read_bytes()}
+	return {str(file.relative_to(path)) : file.read_bytes() for file in sorted(path.rglob('*')) if file.is_file()}
+
+class ReadingOptionsTest(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.temp_dir = tempfile.TemporaryDirectory()
+		cls.directory = Path(cls.temp_dir.name)
+		# Pages with different contents in each revision, and pages with duplicate revisions
+		cls.sample_files = []
+		for name, same_page_width in (('changing', False), ('duplicate', True)):
+			path = cls.directory / (name + '.one')
+			MakeSampleFile(path, revisions=6, pages=3, same_page_width=same_page_width)
+			cls.sample_files.append(path)
+			continue
+		return
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.temp_dir.cleanup()
+		return
+
+	def MakeOutput(self, sample_file:Path, script:str, output_options:list, options:list, output_name:str)->dict:
+		output = self.directory / output_name
+		subprocess.run([sys.executable, str(REPO_DIR / script), str(sample_file)]
+				+ options + output_options + [str(output)],
+				cwd=REPO_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+		return ReadOutput(output)
+
+	def test_same_output(self):
+		for sample_file in self.sample_files:
+			for i, (script, output_options) in enumerate(OUTPUTS):
+				expected = self.MakeOutput(sample_file, script, output_options, [],
+								'%s.%d.expected' % (sample_file.stem, i))
+				self.assertTrue(expected)
+				for options in READING_OPTIONS:
+					with self.subTest(file=sample_file.name, script=script, output=output_options, options=options):
+						self.assertEqual(expected,
+							self.MakeOutput(sample_file, script, output_options, options,
+									'%s.%d.%s' % (sample_file.stem, i, ''.join(options))))
+					continue
+				continue
+			continue
+		return
+
+if __name__ == "__main__":
+	unittest.main()
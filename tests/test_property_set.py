@@ -0,0 +1,77 @@
+#   Copyright 2024 Alexandre Grigoriev
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+# Tests of the compact property set: single properties made on demand
+
+import unittest
+import tempfile
+from pathlib import Path
+
+from sample_file import MakeSampleFile, PID_UndocumentedObjectID
+from ONE.base_types import InternExGUID
+from ONE.property_id import PropertyID
+from ONE.STORE.onestore import OneStoreFile
+
+class GetPropertyTest(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.temp_dir = tempfile.TemporaryDirectory()
+		cls.path = Path(cls.temp_dir.name) / 'sample.one'
+		MakeSampleFile(cls.path, revisions=2)
+		return
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.temp_dir.cleanup()
+		return
+
+	def setUp(self):
+		self.onestore = OneStoreFile.open(self.path, None)
+		root_gosid = self.onestore.GetRootObjectSpaceId()
+		gosid = next(gosid for gosid in self.onestore.GetObjectSpaces() if gosid != root_gosid)
+		object_space = self.onestore.GetObjectSpace(gosid)
+		self.revision = object_space.GetRevision(object_space.GetDefaultContextRevisionId())
+		return
+
+	def tearDown(self):
+		self.onestore.close()
+		return
+
+	def GetPropertySet(self, n:int):
+		return self.revision.GetObjectById(InternExGUID(self.revision.GetRootObjectId().guid, n))
+
+	def test_get_property(self):
+		page_node = self.GetPropertySet(2)
+		page_width = page_node.GetProperty(PropertyID.PageWidth.value)
+		# Other properties are not made
+		self.assertIsNone(page_node._properties)
+		self.assertEqual(PropertyID.PageWidth.value, page_width.key)
+		self.assertEqual(page_width.data, page_node.properties[PropertyID.PageWidth.value].data)
+		self.assertIs(page_node.properties[PropertyID.PageWidth.value], page_node.GetProperty(PropertyID.PageWidth.value))
+
+		# A property referring to an object
+		title = self.GetPropertySet(12)
+		note_oid = title.GetProperty(PID_UndocumentedObjectID).value[0]
+		self.assertEqual(InternExGUID(note_oid.guid, 13), note_oid)
+		return
+
+	def test_missing_property(self):
+		page_node = self.GetPropertySet(2)
+		self.assertIsNone(page_node.GetProperty(PropertyID.ChildGraphSpaceElementNodes.value))
+		self.assertEqual((), page_node.GetProperty(PropertyID.ChildGraphSpaceElementNodes.value, ()))
+		return
+
+if __name__ == "__main__":
+	unittest.main()
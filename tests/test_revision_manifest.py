@@ -0,0 +1,235 @@
+#   Copyright 2024 Alexandre Grigoriev
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+# Tests of the revision manifest object lookup through the dependent revisions,
+# and of the Merkle hashes of the objects
+
+import unittest
+import tempfile
+from hashlib import md5
+from pathlib import Path
+from types import SimpleNamespace
+
+from sample_file import MakeSampleFile
+from ONE.STORE.onestore import OneStoreFile
+from ONE.base_types import InternExGUID
+from ONE.STORE.revision_manifest_list import RevisionManifest, MergeObjectLevels, MAX_OBJECT_CHAIN_DEPTH
+
+def FindObjectInDependentRevisions(revision, oid):
+	# Reference lookup, by walking the dependent revisions one by one
+	while revision is not None:
+		obj = revision.objects.get(oid, None)
+		if obj is not None:
+			return obj
+		revision = revision.dep_revision
+		continue
+	return None
+
+def GetPageRevisions(onestore)->list:
+	# Returns the content revisions of the first page, from the first to the current one
+	root_gosid = onestore.GetRootObjectSpaceId()
+	gosid = next(gosid for gosid in onestore.GetObjectSpaces() if gosid != root_gosid)
+	object_space = onestore.GetObjectSpace(gosid)
+	revision = object_space.GetRevision(object_space.GetDefaultContextRevisionId())
+	revisions = []
+	while revision is not None:
+		revisions.insert(0, revision)
+		revision = revision.dep_revision
+		continue
+	return revisions
+
+class ObjectLevelsTest(unittest.TestCase):
+	def test_merge_chain(self):
+		# The chain is most recent first; the most recent object wins
+		levels = MergeObjectLevels([{'a' : 3}, {'a' : 2, 'b' : 2}, {'a' : 1, 'c' : 1}], ())
+		self.assertEqual(({'a' : 3, 'b' : 2, 'c' : 1},), levels)
+		return
+
+	def test_merge_levels(self):
+		older = {'a' : 1, 'b' : 1}
+		oldest = {i : 0 for i in range(10)}
+		# The new level is smaller than the older levels, they're kept
+		levels = MergeObjectLevels([{'a' : 2}], (older, oldest))
+		self.assertEqual(3, len(levels))
+		self.assertEqual({'a' : 2}, levels[0])
+		self.assertIs(older, levels[1])
+		self.assertIs(oldest, levels[2])
+
+		# The older level is not bigger than the new one, and is merged into it.
+		# The shared levels are not modified
+		levels = MergeObjectLevels([{'a' : 2}, {'c' : 2}], (older, oldest))
+		self.assertEqual(2, len(levels))
+		self.assertEqual({'a' : 2, 'b' : 1, 'c' : 2}, levels[0])
+		self.assertIs(oldest, levels[1])
+		self.assertEqual({'a' : 1, 'b' : 1}, older)
+		return
+
+class DependentRevisionsTest(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.temp_dir = tempfile.TemporaryDirectory()
+		cls.path = Path(cls.temp_dir.name) / 'dependent.one'
+		MakeSampleFile(cls.path, revisions=2 * MAX_OBJECT_CHAIN_DEPTH + 8, all_dependent=True)
+		return
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.temp_dir.cleanup()
+		return
+
+	def setUp(self):
+		self.onestore = OneStoreFile.open(self.path, None)
+		return
+
+	def tearDown(self):
+		self.onestore.close()
+		return
+
+	def test_chain_depth(self):
+		revisions = GetPageRevisions(self.onestore)
+		self.assertEqual(2 * MAX_OBJECT_CHAIN_DEPTH + 8, len(revisions))
+		for i, revision in enumerate(revisions):
+			with self.subTest(revision=i):
+				# The chain is merged into a level when it's longer than MAX_OBJECT_CHAIN_DEPTH
+				self.assertEqual(i % (MAX_OBJECT_CHAIN_DEPTH + 1), len(revision.object_chain))
+				# The following revisions only redeclare a few objects. Their merged level
+				# is smaller than the first one, and is not merged into it
+				self.assertEqual(i // (MAX_OBJECT_CHAIN_DEPTH + 1), len(revision.object_levels))
+			continue
+		# The revision at the boundary still refers to the dependent revision objects through the chain
+		self.assertIs(revisions[MAX_OBJECT_CHAIN_DEPTH - 1].objects,
+					revisions[MAX_OBJECT_CHAIN_DEPTH].object_chain[0])
+		return
+
+	def test_find_object(self):
+		revisions = GetPageRevisions(self.onestore)
+		oids = set()
+		for revision in revisions:
+			oids.update(revision.objects.keys())
+			continue
+		for i, revision in enumerate(revisions):
+			for oid in oids:
+				with self.subTest(revision=i, oid=str(oid)):
+					self.assertIs(FindObjectInDependentRevisions(revision, oid), revision.FindObject(oid))
+				continue
+			continue
+		return
+
+class FakePropSet:
+	# Stands for a property set with the given raw digest and object references
+	def __init__(self, raw_digest:bytes, oids=()):
+		self.raw_digest = raw_digest
+		self.oids = list(oids)
+		return
+
+	def GetRawDigest(self):
+		return self.raw_digest
+
+	def GetObjectIDs(self):
+		return self.oids
+
+def MakeRevision(objects:dict)->RevisionManifest:
+	revision = RevisionManifest.__new__(RevisionManifest)
+	revision.objects = objects
+	revision.object_chain = []
+	revision.object_levels = ()
+	revision.raw_hashes = {}
+	return revision
+
+def ExpectedRawHash(oid, raw_digest:bytes, child_hashes=())->bytes:
+	md5hash = md5(oid.guid, usedforsecurity=False)
+	md5hash.update(oid.n.to_bytes(4, byteorder='little', signed=False))
+	md5hash.update(raw_digest)
+	for child_hash in child_hashes:
+		md5hash.update(child_hash)
+		continue
+	return md5hash.digest()
+
+class RawHashTest(unittest.TestCase):
+	def setUp(self):
+		self.oid_a = InternExGUID(bytes(range(16)), 1)
+		self.oid_b = InternExGUID(bytes(range(16)), 2)
+		return
+
+	def test_same_data(self):
+		# Same data of different objects doesn't make same hashes
+		revision = MakeRevision({self.oid_a : FakePropSet(b'data'), self.oid_b : FakePropSet(b'data')})
+		self.assertEqual(ExpectedRawHash(self.oid_a, b'data'), revision.GetObjectRawHash(self.oid_a))
+		self.assertNotEqual(revision.GetObjectRawHash(self.oid_a), revision.GetObjectRawHash(self.oid_b))
+		return
+
+	def test_null_and_missing_references(self):
+		# A null reference hashes as a zero byte, a missing object as its ID only
+		revision = MakeRevision({self.oid_a : FakePropSet(b'data', [None, self.oid_b])})
+		missing_hash = ExpectedRawHash(self.oid_b, b'')
+		self.assertEqual(missing_hash, revision.GetObjectRawHash(self.oid_b))
+		self.assertEqual(ExpectedRawHash(self.oid_a, b'data', [b'\0', missing_hash]),
+					revision.GetObjectRawHash(self.oid_a))
+		return
+
+	def test_cycle(self):
+		# The reference back to an object being hashed contributes an empty hash
+		revision = MakeRevision({self.oid_a : FakePropSet(b'a', [self.oid_b]),
+								self.oid_b : FakePropSet(b'b', [self.oid_a])})
+		hash_b = ExpectedRawHash(self.oid_b, b'b', [b''])
+		self.assertEqual(ExpectedRawHash(self.oid_a, b'a', [hash_b]), revision.GetObjectRawHash(self.oid_a))
+		self.assertEqual(hash_b, revision.GetObjectRawHash(self.oid_b))
+
+		revision = MakeRevision({self.oid_a : FakePropSet(b'a', [self.oid_a])})
+		self.assertEqual(ExpectedRawHash(self.oid_a, b'a', [b'']), revision.GetObjectRawHash(self.oid_a))
+		return
+
+class RevisionRawHashTest(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.temp_dir = tempfile.TemporaryDirectory()
+		cls.directory = Path(cls.temp_dir.name)
+		return
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.temp_dir.cleanup()
+		return
+
+	def GetContentHashes(self, same_page_width:bool, options=None)->list[bytes]:
+		path = self.directory / ('%d.one' % (same_page_width,))
+		if not path.exists():
+			MakeSampleFile(path, revisions=6, same_page_width=same_page_width, all_dependent=True)
+		onestore = OneStoreFile.open(path, options)
+		try:
+			return [revision.GetObjectRawHash(revision.GetRootObjectId())
+					for revision in GetPageRevisions(onestore)]
+		finally:
+			onestore.close()
+
+	def test_duplicate_revisions(self):
+		# Each two revisions have same contents
+		hashes = self.GetContentHashes(same_page_width=True)
+		self.assertEqual(6, len(hashes))
+		self.assertEqual(hashes[0::2], hashes[1::2])
+		self.assertEqual(3, len(set(hashes)))
+		# Lazy decoding doesn't change the hashes
+		self.assertEqual(hashes, self.GetContentHashes(same_page_width=True, options=SimpleNamespace(lazy=True)))
+		return
+
+	def test_different_revisions(self):
+		# The page width is different in each revision
+		hashes = self.GetContentHashes(same_page_width=False)
+		self.assertEqual(6, len(set(hashes)))
+		self.assertNotIn(b'', hashes)
+		return
+
+if __name__ == "__main__":
+	unittest.main()